@@ -0,0 +1,194 @@
+import argparse
+import json
+import random
+import sys
+import time
+from array import array
+
+import landmarks
+import parallel
+import snapshot
+
+# Seconds between progress reports while sampling
+PROGRESS_INTERVAL = 5
+
+
+class UnionFind():
+    """
+    Disjoint sets over the integers 0..n-1, with union by size and
+    path halving.
+    """
+
+    def __init__(self, n):
+        self.parent = array("i", range(n))
+        self.size = array("i", [1]) * n
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+
+
+def components(graph):
+    """
+    Return a list of the sizes of the connected components of the
+    actor graph, largest first. People in no movie count as their
+    own components.
+    """
+    sets = UnionFind(graph.num_people)
+    for movie in range(graph.num_movies):
+        stars = graph.stars_of(movie)
+        for star in stars[1:]:
+            sets.union(stars[0], star)
+    return sorted(
+        (sets.size[person] for person in range(graph.num_people)
+         if sets.find(person) == person),
+        reverse=True
+    )
+
+
+def separation_profile(source):
+    """
+    Run a breadth-first search from `source` in a worker process and
+    return its eccentricity and the number of people at each distance.
+    """
+    distances = landmarks.distances_from(parallel.graph, source)
+    histogram = []
+    distance = 1
+    while True:
+        count = distances.count(distance)
+        if count == 0:
+            break
+        histogram.append(count)
+        distance += 1
+    return len(histogram), histogram
+
+
+def sample_separations(directory, sources, workers, budget, progress):
+    """
+    Profile `sources` across a pool of `workers` processes until they
+    are all done or `budget` seconds have passed. Report progress to
+    `progress` every PROGRESS_INTERVAL seconds.
+
+    Return the eccentricity of each profiled source and the combined
+    histogram of distances.
+    """
+    start = time.perf_counter()
+    reported = start
+    eccentricities = []
+    histogram = []
+    with parallel.graph_pool(directory, workers) as pool:
+        for done, (eccentricity, counts) in enumerate(
+                pool.imap_unordered(separation_profile, sources), 1):
+            eccentricities.append(eccentricity)
+            for distance, count in enumerate(counts):
+                if distance == len(histogram):
+                    histogram.append(0)
+                histogram[distance] += count
+
+            now = time.perf_counter()
+            elapsed = now - start
+            if now - reported >= PROGRESS_INTERVAL or done == len(sources):
+                reported = now
+                print(f"{done}/{len(sources)} sources, {elapsed:.1f} s, "
+                      f"{done / elapsed:.1f} sources/s", file=progress)
+            if budget is not None and elapsed > budget:
+                print("Time budget reached.", file=progress)
+                break
+    return eccentricities, histogram
+
+
+def report(directory, samples, workers=None, budget=None, seed=0,
+           progress=sys.stderr):
+    """
+    Return a dictionary describing the separation statistics of the
+    dataset in `directory`.
+    """
+    start = time.perf_counter()
+    graph = snapshot.load_graph(directory)
+    sizes = components(graph)
+    component_seconds = time.perf_counter() - start
+    print(f"{len(sizes)} components in {component_seconds:.1f} s",
+          file=progress)
+
+    # Sample people who starred in at least one movie
+    offsets = graph.person_offsets
+    candidates = [
+        person for person in range(graph.num_people)
+        if offsets[person + 1] > offsets[person]
+    ]
+    rng = random.Random(seed)
+    sources = rng.sample(candidates, min(samples, len(candidates)))
+    eccentricities, histogram = sample_separations(
+        directory, sources, workers, budget, progress)
+
+    pairs = sum(histogram)
+    component_histogram = {}
+    for size in sizes:
+        component_histogram[size] = component_histogram.get(size, 0) + 1
+    eccentricity_histogram = {}
+    for eccentricity in eccentricities:
+        eccentricity_histogram[eccentricity] = (
+            eccentricity_histogram.get(eccentricity, 0) + 1)
+    return {
+        "people": graph.num_people,
+        "movies": graph.num_movies,
+        "components": len(sizes),
+        "largest_component": sizes[0] if sizes else 0,
+        "component_sizes": dict(sorted(component_histogram.items())),
+        "sources_requested": len(sources),
+        "sources_profiled": len(eccentricities),
+        "distance_histogram": {
+            distance: count for distance, count in enumerate(histogram, 1)
+        },
+        "mean_separation": (
+            sum(d * c for d, c in enumerate(histogram, 1)) / pairs
+            if pairs else None
+        ),
+        "eccentricity_histogram": dict(sorted(eccentricity_histogram.items())),
+        "max_eccentricity": max(eccentricities, default=0),
+        "seconds": {
+            "components": component_seconds,
+            "total": time.perf_counter() - start,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compute separation statistics for a degrees dataset.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--samples", type=int, default=1000,
+                        help="number of source people to profile with BFS")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes running BFS (default: one per core)")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="stop sampling after this many seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-",
+                        help="file to write the JSON report to")
+    args = parser.parse_args()
+
+    result = report(args.directory, args.samples, args.workers,
+                    args.budget, args.seed)
+    text = json.dumps(result, indent=4)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
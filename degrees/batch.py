@@ -0,0 +1,64 @@
+import csv
+import json
+
+from search import TreeCache
+
+
+def read_queries(filename):
+    """
+    Yield (source, target) person_id pairs from `filename`.
+
+    Files ending in .jsonl hold one {"source": ..., "target": ...}
+    object per line. Any other file is read as CSV with a header row
+    naming `source` and `target` columns.
+    """
+    with open(filename, encoding="utf-8") as f:
+        if filename.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    query = json.loads(line)
+                    yield str(query["source"]), str(query["target"])
+        else:
+            for row in csv.DictReader(f):
+                yield row["source"], row["target"]
+
+
+def answer(graph, cache, source_id, target_id):
+    """
+    Return a JSON-serializable result for one query, finding the path
+    through the search tree of `source_id` held in `cache`.
+    """
+    result = {"source": source_id, "target": target_id}
+    source = graph.person_index(source_id)
+    target = graph.person_index(target_id)
+    if source is None or target is None:
+        result["error"] = "person not found"
+        return result
+
+    path = cache.get(source).path_to(target)
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [
+            [graph.movie_ids[movie], graph.person_ids[person]]
+            for movie, person in path
+        ]
+    return result
+
+
+def run(graph, queries, out, cache_size=16):
+    """
+    Answer every (source, target) pair in `queries`, writing one JSON
+    line per query to `out` as soon as it is answered. Queries that
+    share a source reuse one breadth-first search while its tree stays
+    among the `cache_size` most recently used.
+
+    Return the cache, whose hit and miss counts describe the run.
+    """
+    cache = TreeCache(graph, cache_size)
+    for source_id, target_id in queries:
+        result = answer(graph, cache, source_id, target_id)
+        out.write(json.dumps(result) + "\n")
+    return cache
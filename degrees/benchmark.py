@@ -0,0 +1,167 @@
+import argparse
+import csv
+import gc
+import random
+import time
+import tracemalloc
+
+import degrees
+import ingest
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare degrees search engines over random person pairs.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--pairs", type=int, default=100,
+                        help="number of random source/target pairs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--memory", action="store_true",
+                        help="compare the compact graph with the dict loader")
+    args = parser.parse_args()
+
+    if args.memory:
+        print(f"{'loader':<15} {'MiB':>10} {'load s':>10} {'neighbors us':>14}")
+        for loader, results in compare_memory(args.directory, args.seed).items():
+            print(f"{loader:<15} {results['bytes'] / 2 ** 20:>10.1f} "
+                  f"{results['seconds']:>10.3f} "
+                  f"{results['neighbors'] * 1e6:>14.1f}")
+        return
+
+    print("Loading data...")
+    degrees.load_data(args.directory)
+    print("Data loaded.")
+
+    pairs = random_pairs(args.pairs, args.seed)
+    print(f"{'engine':<15} {'expanded':>12} {'seconds':>10} {'found':>6}")
+    for engine, results in compare(pairs).items():
+        print(f"{engine:<15} {results['expanded']:>12} "
+              f"{results['seconds']:>10.3f} {results['found']:>6}")
+
+
+def random_pairs(n, seed):
+    """
+    Return `n` random (source, target) pairs of distinct person_ids.
+    """
+    rng = random.Random(seed)
+    person_ids = sorted(degrees.graph.person_ids)
+    return [tuple(rng.sample(person_ids, 2)) for _ in range(n)]
+
+
+def compare(pairs):
+    """
+    Run every engine over `pairs`, checking that they agree on path length.
+    Return a dictionary mapping engine name to total nodes expanded,
+    total wall time and number of connected pairs.
+    """
+    results = {}
+    lengths = {}
+    for engine, search in degrees.ENGINES.items():
+        stats = {"expanded": 0}
+        found = 0
+        start = time.perf_counter()
+        for source, target in pairs:
+            path = search(source, target, stats=stats)
+            length = None if path is None else len(path)
+            if lengths.setdefault((source, target), length) != length:
+                raise RuntimeError(
+                    f"{engine} disagrees on {source} -> {target}")
+            if length is not None:
+                found += 1
+        results[engine] = {
+            "expanded": stats["expanded"],
+            "seconds": time.perf_counter() - start,
+            "found": found,
+        }
+    return results
+
+
+def compare_memory(directory, seed, samples=1000):
+    """
+    Load `directory` with the original dict-of-sets loader and with the
+    compact graph. Return a dictionary mapping loader name to bytes
+    allocated, load time and mean time to list a person's neighbors.
+    """
+    return {
+        "dicts": measure(lambda: dict_neighbors(*load_dicts(directory)),
+                         seed, samples),
+        "compact": measure(lambda: graph_neighbors(ingest.load(directory)),
+                           seed, samples),
+    }
+
+
+def measure(load, seed, samples):
+    """
+    Call `load`, which returns a list of person_ids and a neighbors
+    function, while tracing allocations, then time `samples` calls
+    of the neighbors function on random people.
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    person_ids, neighbors = load()
+    seconds = time.perf_counter() - start
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rng = random.Random(seed)
+    sample = [rng.choice(person_ids) for _ in range(samples)]
+    start = time.perf_counter()
+    for person_id in sample:
+        neighbors(person_id)
+    return {
+        "bytes": allocated,
+        "seconds": seconds,
+        "neighbors": (time.perf_counter() - start) / samples,
+    }
+
+
+def dict_neighbors(people, movies):
+    def neighbors(person_id):
+        return {
+            (movie_id, star)
+            for movie_id in people[person_id]["movies"]
+            for star in movies[movie_id]["stars"]
+        }
+    return sorted(people), neighbors
+
+
+def graph_neighbors(graph):
+    def neighbors(person_id):
+        return set(graph.neighbors(graph.person_index(person_id)))
+    return sorted(graph.person_ids), neighbors
+
+
+def load_dicts(directory):
+    """
+    Load `directory` the way degrees.py originally did, into
+    dictionaries of people and movies holding Python sets.
+    """
+    people = {}
+    movies = {}
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            people[row["id"]] = {
+                "name": row["name"],
+                "birth": row["birth"],
+                "movies": set()
+            }
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            movies[row["id"]] = {
+                "title": row["title"],
+                "year": row["year"],
+                "stars": set()
+            }
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                people[row["person_id"]]["movies"].add(row["movie_id"])
+                movies[row["movie_id"]]["stars"].add(row["person_id"])
+            except KeyError:
+                pass
+    return people, movies
+
+
+if __name__ == "__main__":
+    main()
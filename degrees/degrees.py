@@ -1,75 +1,107 @@
-import csv
+import argparse
+import itertools
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+import batch
+import ingest
+import landmarks
+import lookup
+import parallel
+from neighbors import NeighborCache
+import search
+import snapshot
 
-# Maps names to a set of corresponding person_ids
-names = {}
+# Actor/movie graph loaded by load_data
+graph = None
 
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
-people = {}
+# Landmark distance index, if one has been built for the data
+index = None
 
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
-movies = {}
+# Distinct co-stars of recently expanded people, used by A* search
+costars = None
+
+# Exact, prefix and fuzzy lookup of people by name
+name_index = None
 
 
 def load_data(directory):
     """
-    Load data from CSV files into memory.
-    """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    Load data from CSV files into memory, going through a binary
+    snapshot of the parsed graph that is rebuilt whenever the CSV
+    files change.
+    """
+    global graph, index, costars, name_index
+    graph = snapshot.load_graph(directory)
+    index = landmarks.load(directory, graph)
+    costars = NeighborCache(graph)
+    name_index = lookup.NameIndex(graph)
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        usage="python degrees.py [--engine ENGINE] [--bounds] [--batch FILE] "
+              "[directory]")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="bfs",
+                        help="search engine used to find the shortest path")
+    parser.add_argument("--bounds", action="store_true",
+                        help="only report bounds from the landmark index")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer source/target pairs from a CSV or JSONL "
+                             "file, writing JSONL results to stdout")
+    parser.add_argument("--cache-size", type=int, default=16,
+                        help="search trees kept for reuse in batch mode")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes answering batch queries in parallel")
+    parser.add_argument("--policy", choices=lookup.POLICIES,
+                        default="most-connected",
+                        help="how batch mode picks between people who share "
+                             "a name")
+    args = parser.parse_args()
+    directory = args.directory
+
+    if args.batch:
+        load_data(directory)
+        queries = (
+            (_resolve(source, args.policy), _resolve(target, args.policy))
+            for source, target in batch.read_queries(args.batch)
+        )
+        if args.workers > 1:
+            parallel.run(directory, queries, sys.stdout, args.workers)
+        else:
+            cache = batch.run(graph, queries, sys.stdout, args.cache_size)
+            print(f"Searches: {cache.misses}, reused: {cache.hits}",
+                  file=sys.stderr)
+        return
 
     # Load data from files into memory
     print("Loading data...")
     load_data(directory)
     print("Data loaded.")
+    skipped = ingest.dropped(graph.report)
+    if skipped:
+        print(f"Skipped {skipped} malformed, duplicate or dangling rows.")
 
-    source = person_id_for_name(input("Name: "))
+    name = input("Name: ")
+    source = person_id_for_name(name)
     if source is None:
-        sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
+        _not_found(name)
+    name = input("Name: ")
+    target = person_id_for_name(name)
     if target is None:
-        sys.exit("Person not found.")
+        _not_found(name)
+
+    if args.bounds:
+        bounds = separation_bounds(source, target)
+        if bounds is None:
+            print("Not connected.")
+        else:
+            lower, upper = bounds
+            upper = "?" if upper is None else upper
+            print(f"Between {lower} and {upper} degrees of separation.")
+        return
     
-    path = shortest_path(source, target)
+    path = ENGINES[args.engine](source, target)
     if source == target:
         path = 0
     if path is None:
@@ -83,61 +115,154 @@ def main():
             print(f"{degrees} degrees of separation.")
             path = [(None, source)] + path
             for i in range(degrees):
-                person1 = people[path[i][1]]["name"]
-                person2 = people[path[i + 1][1]]["name"]
-                movie = movies[path[i + 1][0]]["title"]
+                person1 = graph.names[graph.person_index(path[i][1])]
+                person2 = graph.names[graph.person_index(path[i + 1][1])]
+                movie = graph.titles[graph.movie_index(path[i + 1][0])]
                 print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    If `stats` is a dict, the number of people whose neighbors were
+    expanded is stored in it under "expanded".
     """
-    # Person ID - Source, Target
-    # TODO
-    elements_explored = set()
-    initial = Node(state=source, parent=None, action=None)
-    queue = QueueFrontier()
-    queue.add(initial)
-    
-    while True:
-        if queue.empty():
-            return None
-        node = queue.remove()
-        elements_explored.add(node.state)
-        actors = neighbors_for_person(node.state) 
-        for movie, actor in actors: 
-            if actor not in elements_explored and not queue.contains_state(actor):
-                child = Node(state=actor, parent=node, action=movie)
-                if child.state == target:
-                    path = []
-                    node = child
-                    while node.parent is not None:
-                        path.append((node.action, node.state))
-                        node = node.parent
-                    path.reverse()
-                    return path
-                queue.add(child)   
-    return None
-
-
-def person_id_for_name(name):
+    return _run(search.bfs, source, target, stats)
+
+
+def shortest_path_bidirectional(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching outward from
+    both people at once and always expanding the smaller frontier.
+
+    If no possible path, returns None.
+
+    If `stats` is a dict, the number of people whose neighbors were
+    expanded is stored in it under "expanded".
+    """
+    return _run(search.bidirectional, source, target, stats)
+
+
+def shortest_path_astar(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, using A* search guided by
+    the landmark index. Without an index this is a plain uniform-cost
+    search.
+
+    If no possible path, returns None.
+
+    If `stats` is a dict, the number of people whose neighbors were
+    expanded is stored in it under "expanded".
+    """
+    def engine(graph, source, target, stats):
+        if index is None:
+            heuristic = lambda person: 0
+        else:
+            heuristic = index.heuristic(target)
+        return search.astar(graph, source, target, heuristic, stats,
+                            costars.costars)
+    return _run(engine, source, target, stats)
+
+
+def all_shortest_paths(source, target):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs that
+    connects the source to the target, one at a time, from a single
+    breadth-first search.
+
+    If no possible path, yields nothing.
+    """
+    dag = search.ShortestPathDAG.build(
+        graph, graph.person_index(source), graph.person_index(target))
+    if dag is None:
+        return
+    for path in dag.paths():
+        yield [
+            (graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path
+        ]
+
+
+def k_shortest_paths(source, target, k):
+    """
+    Returns a list of up to `k` distinct shortest lists of
+    (movie_id, person_id) pairs that connect the source to the target.
+    """
+    return list(itertools.islice(all_shortest_paths(source, target), k))
+
+
+def count_shortest_paths(source, target):
+    """
+    Returns the number of distinct shortest paths between the source
+    and the target without listing them, or 0 if not connected.
+    """
+    dag = search.ShortestPathDAG.build(
+        graph, graph.person_index(source), graph.person_index(target))
+    if dag is None:
+        return 0
+    return dag.count()
+
+
+def separation_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation
+    between two people from the landmark index, without searching.
+    `upper` is None when it is unknown.
+
+    If the people are provably not connected, returns None.
+    """
+    source = graph.person_index(source)
+    target = graph.person_index(target)
+    if index is None:
+        return (0, 0) if source == target else (1, None)
+    return index.bounds(source, target)
+
+
+def _run(engine, source, target, stats):
+    """
+    Runs an index-level search `engine` between two IMDB person ids
+    and translates the resulting path back to IMDB ids.
+    """
+    path = engine(graph, graph.person_index(source),
+                  graph.person_index(target), stats)
+    if path is None:
+        return None
+    return [
+        (graph.movie_ids[movie], graph.person_ids[person])
+        for movie, person in path
+    ]
+
+
+def person_id_for_name(name, policy=None, birth=None):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    By default ambiguities are resolved by asking on the terminal.
+    Given a `policy` from lookup.POLICIES, the name is resolved without
+    asking, falling back to a close fuzzy match if nobody has exactly
+    that name, and optionally only among people born in year `birth`.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    if policy is not None:
+        person = name_index.resolve(name, policy, birth)
+        return None if person is None else graph.person_ids[person]
+
+    people = graph.people_named(name)
+    person_ids = [graph.person_ids[person] for person in people]
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
-        for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
+        for person in people:
+            person_id = graph.person_ids[person]
+            name = graph.names[person]
+            birth = graph.births[person]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
         try:
             person_id = input("Intended Person ID: ")
@@ -150,18 +275,46 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def _resolve(value, policy):
+    """
+    Returns `value` if it is a known IMDB person id, and otherwise
+    the id of the person it names under `policy`, if any.
+    """
+    if graph.person_index(value) is not None:
+        return value
+    return person_id_for_name(value, policy) or value
+
+
+def _not_found(name):
+    """
+    Exits after suggesting people whose names are close to `name`.
+    """
+    if name.strip():
+        suggestions = name_index.candidates(name, 5)
+        if suggestions:
+            print("Did you mean:")
+            for person in suggestions:
+                print(f"  {graph.names[person]} (ID: {graph.person_ids[person]})")
+    sys.exit("Person not found.")
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
-    who starred with a given per
-    son.
-    """
-    movie_ids = people[person_id]["movies"]
-    neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
-    return neighbors
+    who starred with a given person.
+    """
+    return {
+        (graph.movie_ids[movie], graph.person_ids[person])
+        for movie, person in graph.neighbors(graph.person_index(person_id))
+    }
+
+
+# Search engines selectable with --engine
+ENGINES = {
+    "bfs": shortest_path,
+    "bidirectional": shortest_path_bidirectional,
+    "astar": shortest_path_astar,
+}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,226 @@
+import bisect
+from array import array
+
+
+class Graph():
+    """
+    Actor/movie graph with dense integer ids.
+
+    People and movies are numbered 0..n-1 in the order they appear in
+    their CSV files. Adjacency is stored in compressed sparse row form:
+    the movies of person `p` are `person_movies[person_offsets[p]:
+    person_offsets[p + 1]]`, and likewise the stars of movie `m` are
+    found through `movie_offsets` and `movie_stars`.
+
+    IMDB ids and names are looked up by binary search over the
+    `person_order`, `movie_order` and `name_order` permutations, so a
+    graph needs no hash tables and can be mapped straight from disk.
+    Every array and string table only has to support len() and
+    indexing, which lets them be lists, arrays or memoryviews.
+
+    Fuzzy name lookup uses a trigram index in the same form: the
+    people whose lowercased name has the `r`-th of the sorted
+    `trigrams` are `trigram_people[trigram_offsets[r]:
+    trigram_offsets[r + 1]]`, and `trigram_counts[p]` is the number of
+    distinct trigrams in the name of person `p`.
+    """
+
+    # Integer arrays and string tables written to snapshots
+    ARRAYS = (
+        "person_offsets", "person_movies", "movie_offsets", "movie_stars",
+        "person_order", "movie_order", "name_order",
+        "trigram_offsets", "trigram_people", "trigram_counts",
+    )
+    TABLES = ("person_ids", "names", "movie_ids", "titles", "trigrams")
+
+    # Columns that are only read from the CSV files when first used
+    OPTIONAL = ("births", "years")
+
+    def __init__(self, person_offsets, person_movies, movie_offsets,
+                 movie_stars, person_order, movie_order, name_order,
+                 person_ids, names, births, movie_ids, titles, years,
+                 trigrams, trigram_offsets, trigram_people, trigram_counts):
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+        self.person_order = person_order
+        self.movie_order = movie_order
+        self.name_order = name_order
+        self.person_ids = person_ids
+        self.names = names
+        self.births = births
+        self.movie_ids = movie_ids
+        self.titles = titles
+        self.years = years
+        self.trigrams = trigrams
+        self.trigram_offsets = trigram_offsets
+        self.trigram_people = trigram_people
+        self.trigram_counts = trigram_counts
+
+        # Memory map backing the arrays when loaded from a snapshot
+        self.buffer = None
+
+        # Counts of rows kept and dropped when the CSV files were read
+        self.report = {}
+
+    @property
+    def num_people(self):
+        return len(self.person_ids)
+
+    @property
+    def num_movies(self):
+        return len(self.movie_ids)
+
+    def person_index(self, person_id):
+        """
+        Return the dense index of IMDB `person_id`, or None if unknown.
+        """
+        return find(self.person_order, self.person_ids, person_id)
+
+    def movie_index(self, movie_id):
+        """
+        Return the dense index of IMDB `movie_id`, or None if unknown.
+        """
+        return find(self.movie_order, self.movie_ids, movie_id)
+
+    def people_named(self, name):
+        """
+        Return the indices of every person whose name matches `name`,
+        ignoring case.
+        """
+        name = name.lower()
+        key = self.lowercase_name
+        start = bisect.bisect_left(self.name_order, name, key=key)
+        end = bisect.bisect_right(self.name_order, name, lo=start, key=key)
+        return sorted(self.name_order[i] for i in range(start, end))
+
+    def lowercase_name(self, person):
+        return self.names[person].lower()
+
+    def movies_of(self, person):
+        return self.person_movies[
+            self.person_offsets[person]:self.person_offsets[person + 1]]
+
+    def stars_of(self, movie):
+        return self.movie_stars[
+            self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+
+    def neighbors(self, person):
+        """
+        Yield (movie, person) index pairs for everyone who starred
+        in a movie with `person`, including `person` themselves.
+        """
+        movie_offsets, movie_stars = self.movie_offsets, self.movie_stars
+        for movie in self.movies_of(person):
+            for i in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                yield movie, movie_stars[i]
+
+    def nbytes(self):
+        """
+        Return the number of bytes held by the integer arrays.
+        """
+        return sum(memoryview(getattr(self, name)).nbytes
+                   for name in self.ARRAYS)
+
+
+class StringTable():
+    """
+    Sequence of strings stored as one UTF-8 buffer plus an array of
+    offsets, so string `i` is `data[offsets[i]:offsets[i + 1]]`.
+    Strings are only decoded when they are indexed.
+    """
+
+    def __init__(self, offsets=None, data=None):
+        self.offsets = array("q", [0]) if offsets is None else offsets
+        self.data = bytearray() if data is None else data
+
+    @classmethod
+    def from_strings(cls, strings):
+        table = cls()
+        for string in strings:
+            table.append(string)
+        return table
+
+    def append(self, string):
+        self.data += string.encode("utf-8")
+        self.offsets.append(len(self.data))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def find(order, table, value):
+    """
+    Return the index `i` with `table[i] == value`, given `order`,
+    the indices of `table` in sorted order, or None if absent.
+    """
+    position = bisect.bisect_left(order, value, key=table.__getitem__)
+    if position < len(order) and table[order[position]] == value:
+        return order[position]
+    return None
+
+
+def sort_order(values, key=None):
+    """
+    Return an array of the indices of `values` in sorted order,
+    comparing `key(value)` if `key` is given.
+    """
+    if key is None:
+        order = sorted(range(len(values)), key=values.__getitem__)
+    else:
+        order = sorted(range(len(values)), key=lambda i: key(values[i]))
+    return array("i", order)
+
+
+def build_csr(sources, targets, n):
+    """
+    Group the edges `sources[i] -> targets[i]` by source into CSR
+    arrays over `n` rows. Targets within each row are sorted and
+    duplicate edges are dropped.
+    """
+    offsets = array("i", bytes(4 * (n + 1)))
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+
+    placed = array("i", offsets[:-1])
+    values = array("i", bytes(4 * len(sources)))
+    for source, target in zip(sources, targets):
+        values[placed[source]] = target
+        placed[source] += 1
+
+    # Sort each row and squeeze out duplicates in place
+    write = 0
+    start = 0
+    for i in range(n):
+        end = offsets[i + 1]
+        row = sorted(set(values[start:end]))
+        offsets[i] = write
+        values[write:write + len(row)] = array("i", row)
+        write += len(row)
+        start = end
+    offsets[n] = write
+    del values[write:]
+    return offsets, values
+
+
+def transpose(offsets, values, n):
+    """
+    Return the CSR arrays of the reverse of the graph given by
+    `offsets` and `values`, which has `n` rows.
+    """
+    sources = array("i")
+    for row in range(len(offsets) - 1):
+        sources.extend([row] * (offsets[row + 1] - offsets[row]))
+    return build_csr(values, sources, n)
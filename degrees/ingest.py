@@ -0,0 +1,189 @@
+import csv
+import gzip
+import os
+from array import array
+
+import lookup
+from graph import Graph, StringTable, build_csr, sort_order, transpose
+
+# CSV files making up a dataset, each optionally gzip-compressed
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+
+def source_path(directory, filename):
+    """
+    Return the path of `filename` in `directory`, falling back to a
+    gzip-compressed copy named `filename.gz` if only that exists.
+    """
+    path = os.path.join(directory, filename)
+    if not os.path.exists(path) and os.path.exists(path + ".gz"):
+        return path + ".gz"
+    return path
+
+
+def read_rows(path, columns):
+    """
+    Stream the values of `columns` from each row of the CSV file at
+    `path`, which may be gzip-compressed.
+
+    Yield a tuple of values per row, or None for a row that is too
+    short to hold every column, so callers can count malformed rows.
+    """
+    if path.endswith(".gz"):
+        f = gzip.open(path, "rt", encoding="utf-8", newline="")
+    else:
+        f = open(path, encoding="utf-8", newline="")
+    with f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        positions = [header.index(column) for column in columns]
+        width = max(positions) + 1
+        for row in reader:
+            if len(row) < width:
+                yield None
+            else:
+                yield tuple(row[position] for position in positions)
+
+
+class LazyColumn():
+    """
+    Sequence of one CSV column per person or movie that is only read
+    from disk the first time it is indexed, so optional fields such
+    as birth years cost no memory unless something asks for them.
+    """
+
+    def __init__(self, path, column, lookup, size):
+        self.path = path
+        self.column = column
+        self.lookup = lookup
+        self.size = size
+        self.values = None
+
+    def load(self):
+        """
+        Read the column, taking each value from the first row with its
+        id, as `load` keeps only the first of any repeated ids.
+        """
+        values = [""] * self.size
+        filled = bytearray(self.size)
+        for row in read_rows(self.path, ("id", self.column)):
+            if row is None:
+                continue
+            i = self.lookup(row[0])
+            if i is not None and not filled[i]:
+                values[i] = row[1]
+                filled[i] = 1
+        self.values = StringTable.from_strings(values)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if self.values is None:
+            self.load()
+        return self.values[i]
+
+
+def load(directory):
+    """
+    Build a graph by streaming the people, movies and stars CSV files
+    in `directory`, reading only the columns the graph needs.
+
+    The returned graph's `report` counts the rows kept and the rows
+    dropped: malformed rows, repeated ids, stars rows naming an unknown
+    person or movie, and repeated stars rows.
+    """
+    report = {}
+
+    people = StringTable()
+    names = StringTable()
+    person_lookup = {}
+    malformed = duplicates = 0
+    for row in read_rows(source_path(directory, "people.csv"), ("id", "name")):
+        if row is None:
+            malformed += 1
+        elif row[0] in person_lookup:
+            duplicates += 1
+        else:
+            person_lookup[row[0]] = len(people)
+            people.append(row[0])
+            names.append(row[1])
+    report["people"] = len(people)
+    report["people_malformed"] = malformed
+    report["people_duplicate"] = duplicates
+
+    movies = StringTable()
+    titles = StringTable()
+    movie_lookup = {}
+    malformed = duplicates = 0
+    for row in read_rows(source_path(directory, "movies.csv"), ("id", "title")):
+        if row is None:
+            malformed += 1
+        elif row[0] in movie_lookup:
+            duplicates += 1
+        else:
+            movie_lookup[row[0]] = len(movies)
+            movies.append(row[0])
+            titles.append(row[1])
+    report["movies"] = len(movies)
+    report["movies_malformed"] = malformed
+    report["movies_duplicate"] = duplicates
+
+    edge_people = array("i")
+    edge_movies = array("i")
+    malformed = dangling = 0
+    path = source_path(directory, "stars.csv")
+    for row in read_rows(path, ("person_id", "movie_id")):
+        if row is None:
+            malformed += 1
+            continue
+        person = person_lookup.get(row[0])
+        movie = movie_lookup.get(row[1])
+        if person is None or movie is None:
+            dangling += 1
+            continue
+        edge_people.append(person)
+        edge_movies.append(movie)
+    del person_lookup, movie_lookup
+
+    person_offsets, person_movies = build_csr(
+        edge_people, edge_movies, len(people))
+    report["stars"] = len(person_movies)
+    report["stars_malformed"] = malformed
+    report["stars_dangling"] = dangling
+    report["stars_duplicate"] = len(edge_people) - len(person_movies)
+    del edge_people, edge_movies
+    movie_offsets, movie_stars = transpose(
+        person_offsets, person_movies, len(movies))
+
+    graph = Graph(
+        person_offsets, person_movies, movie_offsets, movie_stars,
+        sort_order(people), sort_order(movies),
+        sort_order(names, key=str.lower),
+        people, names, None, movies, titles, None,
+        *lookup.index_names(names),
+    )
+    attach_optional(graph, directory)
+    graph.report = report
+    return graph
+
+
+def attach_optional(graph, directory):
+    """
+    Give `graph` lazily loaded birth and year columns read from the
+    CSV files in `directory`.
+    """
+    graph.births = LazyColumn(source_path(directory, "people.csv"), "birth",
+                              graph.person_index, graph.num_people)
+    graph.years = LazyColumn(source_path(directory, "movies.csv"), "year",
+                             graph.movie_index, graph.num_movies)
+
+
+def dropped(report):
+    """
+    Return the total number of rows dropped according to `report`.
+    """
+    return sum(
+        count for key, count in report.items()
+        if key.endswith(("_malformed", "_duplicate", "_dangling"))
+    )
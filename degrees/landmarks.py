@@ -0,0 +1,199 @@
+import argparse
+import json
+import mmap
+import os
+import time
+from array import array
+from collections import deque
+
+import snapshot
+from neighbors import Expansion
+
+# Name of the index file written next to the CSV files
+FILENAME = "degrees.landmarks"
+
+MAGIC = b"DEGLMK01"
+VERSION = 1
+
+# Distance recorded for people a landmark cannot reach
+UNREACHABLE = 255
+
+
+class LandmarkIndex():
+    """
+    Breadth-first distances from a few well-connected people, the
+    landmarks, to everyone else.
+
+    By the triangle inequality, the separation between two people is
+    at least the difference and at most the sum of their distances to
+    any landmark, so the index bounds separation without searching.
+    """
+
+    def __init__(self, landmarks, distances):
+        self.landmarks = landmarks
+        self.distances = distances
+
+        # Memory map backing the distances when loaded from disk
+        self.buffer = None
+
+    def bounds(self, source, target):
+        """
+        Return (lower, upper) bounds on the degrees of separation
+        between people `source` and `target`, where `upper` is None if
+        no landmark reaches them. Return None if the two are provably
+        not connected.
+        """
+        if source == target:
+            return 0, 0
+        lower, upper = 1, None
+        for row in self.distances:
+            a, b = row[source], row[target]
+            if a == UNREACHABLE and b == UNREACHABLE:
+                continue
+            if a == UNREACHABLE or b == UNREACHABLE:
+                return None
+            lower = max(lower, abs(a - b))
+            if upper is None or a + b < upper:
+                upper = a + b
+        return lower, upper
+
+    def heuristic(self, target):
+        """
+        Return a function giving, for any person, a lower bound on
+        their distance to `target`, or None if they cannot reach it.
+        """
+        rows = [(row, row[target]) for row in self.distances]
+
+        def estimate(person):
+            best = 0
+            for row, b in rows:
+                a = row[person]
+                if a == UNREACHABLE and b == UNREACHABLE:
+                    continue
+                if a == UNREACHABLE or b == UNREACHABLE:
+                    return None
+                if abs(a - b) > best:
+                    best = abs(a - b)
+            return best
+        return estimate
+
+    def nbytes(self):
+        return sum(len(row) for row in self.distances)
+
+
+def select(graph, k):
+    """
+    Return the `k` people who appear in the most movies.
+    """
+    offsets = graph.person_offsets
+    people = sorted(
+        range(graph.num_people),
+        key=lambda person: offsets[person] - offsets[person + 1]
+    )
+    return people[:k]
+
+
+def distances_from(graph, source):
+    """
+    Return a bytearray of the breadth-first distance from `source` to
+    every person, with UNREACHABLE for people in other components.
+    Distances too large to store are clamped to UNREACHABLE - 1.
+    """
+    distances = bytearray([UNREACHABLE]) * graph.num_people
+    distances[source] = 0
+    expansion = Expansion(graph)
+    queue = deque([source])
+    while queue:
+        person = queue.popleft()
+        distance = min(distances[person] + 1, UNREACHABLE - 1)
+        for movie, neighbor in expansion.neighbors(person):
+            if distances[neighbor] == UNREACHABLE:
+                distances[neighbor] = distance
+                queue.append(neighbor)
+    return distances
+
+
+def build(graph, k=16):
+    """
+    Return a landmark index over the `k` best-connected people.
+    """
+    landmarks = select(graph, k)
+    return LandmarkIndex(
+        array("i", landmarks),
+        [distances_from(graph, landmark) for landmark in landmarks]
+    )
+
+
+def save(index, path, stamp):
+    """
+    Write `index` to `path`, recording the CSV `stamp` it was built from.
+    """
+    header = json.dumps({
+        "version": VERSION,
+        "stamp": stamp,
+        "landmarks": list(index.landmarks),
+    }).encode("utf-8")
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for row in index.distances:
+            f.write(row)
+    os.replace(temporary, path)
+
+
+def load(directory, graph):
+    """
+    Map the landmark index saved for `directory`, or return None if
+    there is none or it was built from different CSV files.
+    """
+    path = os.path.join(directory, FILENAME)
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(length))
+            if (header["version"] != VERSION or
+                    header["stamp"] != snapshot.source_stamp(directory)):
+                return None
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, KeyError):
+        return None
+
+    start = len(MAGIC) + 8 + length
+    n = graph.num_people
+    view = memoryview(buffer)
+    distances = [
+        view[start + i * n:start + (i + 1) * n]
+        for i in range(len(header["landmarks"]))
+    ]
+    index = LandmarkIndex(array("i", header["landmarks"]), distances)
+    index.buffer = buffer
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the landmark distance index for a degrees dataset.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("-k", "--landmarks", type=int, default=16,
+                        help="number of landmarks to index")
+    args = parser.parse_args()
+
+    graph = snapshot.load_graph(args.directory)
+    start = time.perf_counter()
+    index = build(graph, args.landmarks)
+    seconds = time.perf_counter() - start
+    save(index, os.path.join(args.directory, FILENAME),
+         snapshot.source_stamp(args.directory))
+
+    print(f"Landmarks: {len(index.landmarks)}")
+    print(f"People: {graph.num_people}")
+    print(f"Index size: {index.nbytes() / 2 ** 20:.1f} MiB")
+    print(f"Build time: {seconds:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import bisect
+import math
+from array import array
+
+import numpy as np
+
+from graph import StringTable
+
+# Ways to pick one person when several share a name
+POLICIES = ("most-connected", "first", "none")
+
+# Lowest trigram similarity a fuzzy match needs to be resolved to
+MIN_SIMILARITY = 0.5
+
+# Fuzzy lookup first reads the rarest trigrams' lists of people until
+# it has read at least this many people
+FIRST_READ = 10000
+
+
+class NameIndex():
+    """
+    Name lookup over a graph: exact and prefix matches by binary search
+    over the graph's sorted name order, and fuzzy matches through the
+    graph's trigram index.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+        # Row of each trigram in the graph's index, and the index's
+        # people and trigram counts as arrays, set up when first used
+        self.rows = None
+        self.people = None
+        self.sizes = None
+
+    def exact(self, name):
+        """
+        Return the people whose name is `name`, ignoring case.
+        """
+        return self.graph.people_named(name)
+
+    def prefix(self, prefix, limit=10):
+        """
+        Return up to `limit` people whose name starts with `prefix`,
+        ignoring case, in name order.
+        """
+        prefix = prefix.lower()
+        order = self.graph.name_order
+        key = self.graph.lowercase_name
+        start = bisect.bisect_left(order, prefix, key=key)
+        people = []
+        for i in range(start, min(start + limit, len(order))):
+            if not key(order[i]).startswith(prefix):
+                break
+            people.append(order[i])
+        return people
+
+    def fuzzy(self, name, limit=10):
+        """
+        Return up to `limit` (similarity, person) pairs for the names
+        most similar to `name`, best first, where similarity is the
+        Jaccard similarity of their sets of trigrams.
+
+        A name sharing more than `d` of `name`'s trigrams is on at
+        least one of its trigrams' lists of people once the `d`
+        longest are left out, so scoring everyone on the shorter lists
+        finds every name more similar than `d` over the number of
+        trigrams. Lists are read rarest first, each round reading
+        about twice as many people as the last, until the `limit`-th
+        best score found is above that: the result is the same as
+        scoring every name, but common trigrams are rarely read.
+        """
+        graph = self.graph
+        if self.rows is None:
+            self.rows = {
+                trigram: row for row, trigram in enumerate(graph.trigrams)
+            }
+            self.people = np.frombuffer(graph.trigram_people, dtype=np.intc)
+            self.sizes = np.frombuffer(graph.trigram_counts, dtype=np.intc)
+        wanted = trigrams(name.lower())
+        offsets = graph.trigram_offsets
+        lists = sorted(
+            (self.people[offsets[row]:offsets[row + 1]]
+             for row in map(self.rows.get, wanted) if row is not None),
+            key=len
+        )
+        if not lists:
+            return []
+        lengths = [0]
+        for found in lists:
+            lengths.append(lengths[-1] + len(found))
+
+        # Lists to leave out, and the `limit`-th best score found
+        dropped = len(lists)
+        least = 0
+        while dropped:
+            read = len(lists) - dropped
+            wider = len(lists) - bisect.bisect_left(
+                lengths, max(2 * lengths[read], FIRST_READ), lo=read + 1)
+            dropped = max(math.ceil(least * len(wanted) - 1e-9) - 1,
+                          min(wider, dropped - 1))
+            similarities, people = self.best(
+                lists, dropped, len(wanted), limit,
+                max(least, dropped / len(wanted)))
+            if len(similarities) == limit:
+                least = max(least, similarities[-1])
+            if least * len(wanted) > dropped:
+                break
+        return [
+            (float(similarity), int(person))
+            for similarity, person in zip(similarities, people)
+        ]
+
+    def best(self, lists, dropped, wanted, limit, least):
+        """
+        Return the similarities and people, best first, of up to
+        `limit` of the people at least as similar as `least` to a name
+        with `wanted` trigrams, given `lists`, sorted arrays of the
+        people sharing each of its trigrams that are in the index.
+        Only people on one of the lists other than the `dropped`
+        longest are found; the dropped lists are only searched for
+        them.
+        """
+        # Count the lists each person is on by sorting them together
+        people = np.sort(np.concatenate(lists[:len(lists) - dropped]))
+        last = np.empty(len(people), dtype=bool)
+        last[-1] = True
+        np.not_equal(people[1:], people[:-1], out=last[:-1])
+        ends = np.flatnonzero(last)
+        shared = np.diff(ends, prepend=-1)
+        people = people[ends]
+
+        # Names as similar as `least` share at least `needed` trigrams,
+        # so drop people once the lists left cannot make up the rest
+        sizes = self.sizes[people]
+        needed = np.ceil(least * (wanted + sizes) / (1 + least) - 1e-9)
+        keep = (shared + dropped >= needed) & (sizes >= needed)
+        people, shared, sizes = people[keep], shared[keep], sizes[keep]
+        needed = needed[keep]
+        left = dropped
+        for found in lists[len(lists) - dropped:]:
+            left -= 1
+            if len(found) >= len(people):
+                position = np.searchsorted(found, people)
+                position[position == len(found)] = 0
+                shared += found[position] == people
+            else:
+                position = np.searchsorted(people, found)
+                position[position == len(people)] = 0
+                shared[position[people[position] == found]] += 1
+            keep = shared + left >= needed
+            people, shared = people[keep], shared[keep]
+            sizes, needed = sizes[keep], needed[keep]
+        similarities = shared / (wanted + sizes - shared)
+        order = np.lexsort((people, -similarities))[:limit]
+        return similarities[order], people[order]
+
+    def candidates(self, name, limit=10):
+        """
+        Return up to `limit` people who may be meant by `name`: exact
+        matches first, then prefix matches, then fuzzy matches.
+        """
+        ranked = self.exact(name)
+        for person in self.prefix(name, limit):
+            if person not in ranked:
+                ranked.append(person)
+        if len(ranked) < limit:
+            for _, person in self.fuzzy(name, limit):
+                if person not in ranked:
+                    ranked.append(person)
+        return ranked[:limit]
+
+    def resolve(self, name, policy="most-connected", birth=None):
+        """
+        Return the one person meant by `name` without asking anyone,
+        or None if there is no good match.
+
+        Exact matches win; failing those, the best fuzzy match is used
+        if it is similar enough. If `birth` is given, only people born
+        that year count. Ties are broken by `policy`: "most-connected"
+        picks whoever starred in the most movies, "first" picks the
+        first listed in the data, and "none" gives up.
+        """
+        people = self.exact(name)
+        if not people:
+            matches = self.fuzzy(name, limit=10)
+            if matches and matches[0][0] >= MIN_SIMILARITY:
+                best = matches[0][0]
+                people = [person for score, person in matches if score == best]
+        if birth is not None:
+            people = [
+                person for person in people
+                if self.graph.births[person] == str(birth)
+            ]
+
+        if len(people) <= 1:
+            return people[0] if people else None
+        if policy == "most-connected":
+            offsets = self.graph.person_offsets
+            return min(
+                people,
+                key=lambda p: (offsets[p] - offsets[p + 1], p)
+            )
+        if policy == "first":
+            return min(people)
+        return None
+
+
+def trigrams(text):
+    """
+    Return the set of three-character substrings of `text`, padded so
+    that short names and word boundaries still produce trigrams.
+    """
+    text = f"  {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def index_names(names):
+    """
+    Return a trigram index over `names`: their distinct trigrams, in
+    sorted order, as a string table; CSR offsets and people listing,
+    in order, everyone whose lowercased name has each trigram; and the
+    number of distinct trigrams in each name.
+    """
+    postings = {}
+    sizes = array("i")
+    for person, name in enumerate(names):
+        found = trigrams(name.lower())
+        sizes.append(len(found))
+        for trigram in found:
+            if trigram not in postings:
+                postings[trigram] = array("i")
+            postings[trigram].append(person)
+
+    keys = sorted(postings)
+    offsets = array("i", [0])
+    people = array("i")
+    for key in keys:
+        people.extend(postings.pop(key))
+        offsets.append(len(people))
+    return StringTable.from_strings(keys), offsets, people, sizes
@@ -0,0 +1,81 @@
+from collections import OrderedDict
+
+
+class Expansion():
+    """
+    Neighbor view for a single breadth-first search that scans each
+    movie's cast at most once.
+
+    In a breadth-first search, everyone in a movie is discovered the
+    first time any of its stars is expanded, so later stars of the same
+    movie cannot reach anyone new through it. Skipping those movies
+    keeps a hub with a huge cast from being rescanned for every actor
+    in it.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.seen = set()
+
+    def neighbors(self, person):
+        """
+        Yield (movie, person) index pairs for the stars of every movie
+        of `person` that this search has not scanned yet.
+        """
+        graph = self.graph
+        seen = self.seen
+        movie_offsets, movie_stars = graph.movie_offsets, graph.movie_stars
+        for movie in graph.movies_of(person):
+            if movie in seen:
+                continue
+            seen.add(movie)
+            for i in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                yield movie, movie_stars[i]
+
+
+class NeighborCache():
+    """
+    Least-recently-used cache of each person's distinct co-stars.
+
+    The cache holds at most `max_size` (movie, person) pairs in total,
+    so a few prolific actors cannot push memory use without bound.
+    """
+
+    def __init__(self, graph, max_size=1000000):
+        self.graph = graph
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def costars(self, person):
+        """
+        Return a tuple of (movie, person) index pairs holding one pair
+        for each distinct person who starred with `person`, through the
+        first movie they share.
+        """
+        entry = self.entries.get(person)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(person)
+            return entry
+
+        self.misses += 1
+        found = {}
+        for movie, costar in self.graph.neighbors(person):
+            if costar != person and costar not in found:
+                found[costar] = movie
+        entry = tuple((movie, costar) for costar, movie in found.items())
+
+        if len(entry) <= self.max_size:
+            self.entries[person] = entry
+            self.size += len(entry)
+            while self.size > self.max_size:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+        return entry
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
@@ -0,0 +1,109 @@
+import contextlib
+import json
+import multiprocessing
+import os
+import tempfile
+
+import batch
+import snapshot
+from search import TreeCache
+
+# Graph mapped by each worker process from the shared snapshot
+graph = None
+
+
+def run(directory, queries, out, workers=None, window=10000):
+    """
+    Answer every (source, target) pair in `queries` across a pool of
+    `workers` processes, writing one JSON line per query to `out` in
+    input order.
+
+    Queries are read `window` at a time and grouped by source, and each
+    group is answered by one breadth-first search in one worker.
+    """
+    with graph_pool(directory, workers) as pool:
+        for chunk in windows(queries, window):
+            for result in answer_window(pool, chunk):
+                out.write(json.dumps(result) + "\n")
+
+
+@contextlib.contextmanager
+def graph_pool(directory, workers=None):
+    """
+    Yield a pool of `workers` processes whose module-level `graph` is
+    the graph for `directory`.
+
+    Workers map the graph from the snapshot file rather than receiving
+    it pickled, so the arrays are shared through the page cache.
+    """
+    # Make sure an up-to-date snapshot exists before workers start
+    loaded = snapshot.load_graph(directory)
+    path = os.path.join(directory, snapshot.FILENAME)
+    temporary = None
+    if snapshot.load(path, snapshot.source_stamp(directory)) is None:
+        # The data directory is read-only, so share a private copy
+        descriptor, temporary = tempfile.mkstemp(suffix=".snapshot")
+        os.close(descriptor)
+        snapshot.save(loaded, temporary, {})
+        path = temporary
+    del loaded
+
+    try:
+        with multiprocessing.Pool(workers, initializer=init,
+                                  initargs=(path, directory)) as pool:
+            yield pool
+    finally:
+        if temporary is not None:
+            os.remove(temporary)
+
+
+def windows(queries, size):
+    """
+    Yield successive lists of at most `size` queries.
+    """
+    chunk = []
+    for query in queries:
+        chunk.append(query)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def answer_window(pool, queries):
+    """
+    Return the results for `queries` in order, answering each group
+    of queries that share a source as one task on `pool`.
+    """
+    groups = {}
+    for i, (source_id, target_id) in enumerate(queries):
+        groups.setdefault(source_id, []).append((i, target_id))
+
+    results = [None] * len(queries)
+    tasks = list(groups.items())
+    for answers in pool.imap_unordered(answer_group, tasks):
+        for i, result in answers:
+            results[i] = result
+    return results
+
+
+def init(path, directory):
+    """
+    Map the graph snapshot at `path` in a worker process.
+    """
+    global graph
+    graph = snapshot.load(path, directory=directory)
+
+
+def answer_group(task):
+    """
+    Answer every target of one source with a single search tree.
+    Return (index, result) pairs.
+    """
+    source_id, targets = task
+    cache = TreeCache(graph, maxsize=1)
+    return [
+        (i, batch.answer(graph, cache, source_id, target_id))
+        for i, target_id in targets
+    ]
@@ -0,0 +1,362 @@
+import heapq
+from collections import OrderedDict, deque
+
+from neighbors import Expansion
+from util import Node, DequeQueueFrontier
+
+
+def bfs(graph, source, target, stats=None):
+    """
+    Return the shortest list of (movie, person) index pairs that
+    connect person `source` to person `target` in `graph`,
+    expanding outward from the source one person at a time.
+
+    If no possible path, return None.
+
+    If `stats` is a dict, the number of people whose neighbors were
+    expanded is added to it under "expanded".
+    """
+    if stats is not None:
+        stats.setdefault("expanded", 0)
+    if source == target:
+        return []
+
+    expansion = Expansion(graph)
+    explored = set()
+    queue = DequeQueueFrontier()
+    queue.add(Node(state=source, parent=None, action=None))
+
+    while not queue.empty():
+        node = queue.remove()
+        explored.add(node.state)
+        if stats is not None:
+            stats["expanded"] += 1
+        for movie, person in expansion.neighbors(node.state):
+            if person in explored or queue.contains_state(person):
+                continue
+            child = Node(state=person, parent=node, action=movie)
+            if person == target:
+                path = []
+                while child.parent is not None:
+                    path.append((child.action, child.state))
+                    child = child.parent
+                path.reverse()
+                return path
+            queue.add(child)
+    return None
+
+
+def bidirectional(graph, source, target, stats=None):
+    """
+    Return the shortest list of (movie, person) index pairs that
+    connect person `source` to person `target` in `graph`, searching
+    outward from both people at once and always expanding the
+    smaller frontier.
+
+    If no possible path, return None.
+
+    If `stats` is a dict, the number of people whose neighbors were
+    expanded is added to it under "expanded".
+    """
+    if stats is not None:
+        stats.setdefault("expanded", 0)
+    if source == target:
+        return []
+
+    # Each side maps a reached person to (movie, person) of the
+    # step that reached it, and remembers its distance from its root
+    forward = {source: None}
+    backward = {target: None}
+    forward_depth = {source: 0}
+    backward_depth = {target: 0}
+    forward_frontier = [source]
+    backward_frontier = [target]
+    forward_expansion = Expansion(graph)
+    backward_expansion = Expansion(graph)
+
+    while forward_frontier and backward_frontier:
+
+        # Grow whichever side currently has fewer people to expand
+        if len(forward_frontier) <= len(backward_frontier):
+            frontier, parents, depth = forward_frontier, forward, forward_depth
+            other, other_depth = backward, backward_depth
+            expansion = forward_expansion
+        else:
+            frontier, parents, depth = backward_frontier, backward, backward_depth
+            other, other_depth = forward, forward_depth
+            expansion = backward_expansion
+
+        # Expand the whole layer so the best meeting point can be chosen
+        next_frontier = []
+        meeting = None
+        best = None
+        for person in frontier:
+            if stats is not None:
+                stats["expanded"] += 1
+            for movie, neighbor in expansion.neighbors(person):
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = (movie, person)
+                depth[neighbor] = depth[person] + 1
+                next_frontier.append(neighbor)
+                if neighbor in other:
+                    length = depth[neighbor] + other_depth[neighbor]
+                    if best is None or length < best:
+                        meeting, best = neighbor, length
+
+        if meeting is not None:
+            return join_paths(forward, backward, meeting)
+
+        if frontier is forward_frontier:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    return None
+
+
+def astar(graph, source, target, heuristic, stats=None, neighbors=None):
+    """
+    Return the shortest list of (movie, person) index pairs that
+    connect person `source` to person `target` in `graph`, expanding
+    people in order of distance travelled plus `heuristic(person)`.
+
+    `heuristic` must never overestimate a person's distance to the
+    target, and returns None for people who cannot reach it at all.
+    `neighbors` lists the (movie, person) pairs to expand from a
+    person, and defaults to `graph.neighbors`. Unlike breadth-first
+    search, A* may reach a movie's cast more cheaply later on, so it
+    cannot skip movies it has already scanned.
+
+    If no possible path, return None.
+
+    If `stats` is a dict, the number of people whose neighbors were
+    expanded is added to it under "expanded".
+    """
+    if stats is not None:
+        stats.setdefault("expanded", 0)
+    if source == target:
+        return []
+    estimate = heuristic(source)
+    if estimate is None:
+        return None
+
+    if neighbors is None:
+        neighbors = graph.neighbors
+    parents = {source: None}
+    costs = {source: 0}
+    closed = set()
+
+    # Ties on estimated total go to whoever has travelled further
+    heap = [(estimate, 0, source)]
+    while heap:
+        _, cost, person = heapq.heappop(heap)
+        cost = -cost
+        if person in closed:
+            continue
+        if person == target:
+            return trace(parents, target)
+        closed.add(person)
+        if stats is not None:
+            stats["expanded"] += 1
+        for movie, neighbor in neighbors(person):
+            if neighbor in closed:
+                continue
+            if neighbor in costs and costs[neighbor] <= cost + 1:
+                continue
+            estimate = heuristic(neighbor)
+            if estimate is None:
+                continue
+            costs[neighbor] = cost + 1
+            parents[neighbor] = (movie, person)
+            heapq.heappush(heap, (cost + 1 + estimate, -cost - 1, neighbor))
+    return None
+
+
+def trace(parents, person):
+    """
+    Follow `parents` back from `person` to the root and return the
+    path as a list of (movie, person) pairs starting at the root.
+    """
+    path = []
+    while parents[person] is not None:
+        movie, parent = parents[person]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+    return path
+
+
+def join_paths(forward, backward, meeting):
+    """
+    Stitch the two halves of a bidirectional search together at
+    `meeting` into a list of (movie, person) pairs.
+    """
+    path = trace(forward, meeting)
+    person = meeting
+    while backward[person] is not None:
+        movie, child = backward[person]
+        path.append((movie, child))
+        person = child
+    return path
+
+
+class SearchTree():
+    """
+    Breadth-first search tree grown lazily from one source person.
+
+    The tree only expands as far as needed to reach the targets asked
+    for so far, and keeps its frontier so later targets resume the
+    same traversal instead of starting over.
+    """
+
+    def __init__(self, graph, source):
+        self.graph = graph
+        self.source = source
+        self.parents = {source: None}
+        self.frontier = deque([source])
+        self.expansion = Expansion(graph)
+        self.expanded = 0
+
+    def path_to(self, target):
+        """
+        Return the shortest list of (movie, person) index pairs from
+        the source to `target`, or None if they are not connected.
+        """
+        parents = self.parents
+        while target not in parents and self.frontier:
+            person = self.frontier.popleft()
+            self.expanded += 1
+            for movie, neighbor in self.expansion.neighbors(person):
+                if neighbor not in parents:
+                    parents[neighbor] = (movie, person)
+                    self.frontier.append(neighbor)
+        if target not in parents:
+            return None
+        return trace(parents, target)
+
+
+class TreeCache():
+    """
+    Least-recently-used cache of search trees keyed by source person.
+    """
+
+    def __init__(self, graph, maxsize=16):
+        self.graph = graph
+        self.maxsize = maxsize
+        self.trees = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source):
+        """
+        Return the search tree for `source`, creating it if needed.
+        """
+        tree = self.trees.get(source)
+        if tree is not None:
+            self.hits += 1
+            self.trees.move_to_end(source)
+            return tree
+
+        self.misses += 1
+        tree = SearchTree(self.graph, source)
+        self.trees[source] = tree
+        if len(self.trees) > self.maxsize:
+            self.trees.popitem(last=False)
+        return tree
+
+
+class ShortestPathDAG():
+    """
+    Every shortest path between two people, as the set of (movie,
+    parent) steps that lie on some shortest path into each person.
+
+    Paths are counted without listing them and enumerated lazily, so
+    huge path sets never have to exist in memory at once.
+    """
+
+    def __init__(self, source, target, steps):
+        self.source = source
+        self.target = target
+        self.steps = steps
+
+    @classmethod
+    def build(cls, graph, source, target):
+        """
+        Return the DAG of shortest paths from `source` to `target`
+        found by one breadth-first search, or None if they are not
+        connected.
+        """
+        depth = {source: 0}
+        steps = {source: []}
+        layer = [source]
+        while layer and target not in depth:
+            next_layer = []
+            for person in layer:
+                for movie, neighbor in graph.neighbors(person):
+                    if neighbor not in depth:
+                        depth[neighbor] = depth[person] + 1
+                        steps[neighbor] = []
+                        next_layer.append(neighbor)
+                    if depth[neighbor] == depth[person] + 1:
+                        steps[neighbor].append((movie, person))
+            layer = next_layer
+        if target not in depth:
+            return None
+
+        # Keep only the people who lie on a path into the target
+        kept = {}
+        pending = [target]
+        while pending:
+            person = pending.pop()
+            if person in kept:
+                continue
+            kept[person] = steps[person]
+            pending.extend(parent for _, parent in steps[person])
+        return cls(source, target, kept)
+
+    def count(self):
+        """
+        Return the number of distinct shortest paths.
+        """
+        ways = {self.source: 1}
+        for person in self.order():
+            if person != self.source:
+                ways[person] = sum(
+                    ways[parent] for _, parent in self.steps[person])
+        return ways[self.target]
+
+    def order(self):
+        """
+        Return the people of the DAG with every parent before its children.
+        """
+        order = []
+        visited = set()
+        stack = [(self.target, False)]
+        while stack:
+            person, done = stack.pop()
+            if done:
+                order.append(person)
+            elif person not in visited:
+                visited.add(person)
+                stack.append((person, True))
+                for _, parent in self.steps[person]:
+                    if parent not in visited:
+                        stack.append((parent, False))
+        return order
+
+    def paths(self):
+        """
+        Yield every shortest path as a list of (movie, person) pairs,
+        one at a time.
+        """
+        return self._paths_to(self.target)
+
+    def _paths_to(self, person):
+        if person == self.source:
+            yield []
+            return
+        for movie, parent in self.steps[person]:
+            for path in self._paths_to(parent):
+                path.append((movie, person))
+                yield path
@@ -0,0 +1,133 @@
+import json
+import mmap
+import os
+import sys
+
+import ingest
+from graph import Graph, StringTable
+
+# Name of the snapshot file written next to the CSV files
+FILENAME = "degrees.snapshot"
+
+MAGIC = b"DEGSNAP1"
+VERSION = 3
+ALIGNMENT = 8
+
+
+def load_graph(directory):
+    """
+    Return the graph for `directory`, mapping it from the snapshot
+    file when that is up to date with the CSV files and otherwise
+    parsing the CSV files and writing a fresh snapshot.
+    """
+    path = os.path.join(directory, FILENAME)
+    stamp = source_stamp(directory)
+    graph = load(path, stamp)
+    if graph is None:
+        graph = ingest.load(directory)
+        try:
+            save(graph, path, stamp)
+        except OSError:
+            # A read-only data directory just means no cache
+            pass
+    return graph
+
+
+def source_stamp(directory):
+    """
+    Return the modification time and size of each CSV source file.
+    """
+    stamp = {}
+    for filename in ingest.SOURCES:
+        path = ingest.source_path(directory, filename)
+        info = os.stat(path)
+        stamp[os.path.basename(path)] = [info.st_mtime_ns, info.st_size]
+    return stamp
+
+
+def save(graph, path, stamp):
+    """
+    Write `graph` to a snapshot at `path`, recording `stamp`.
+    """
+    sections = []
+    for name in Graph.ARRAYS:
+        sections.append((name, "i", getattr(graph, name)))
+    for name in Graph.TABLES:
+        table = getattr(graph, name)
+        if not isinstance(table, StringTable):
+            table = StringTable.from_strings(table)
+        sections.append((f"{name}.offsets", "q", table.offsets))
+        sections.append((f"{name}.data", "B", table.data))
+
+    # Lay sections out back to back, each aligned for its item size
+    layout = {}
+    position = 0
+    for name, typecode, values in sections:
+        nbytes = memoryview(values).nbytes
+        layout[name] = [position, nbytes, typecode]
+        position = align(position + nbytes)
+    header = json.dumps({
+        "version": VERSION,
+        "byteorder": sys.byteorder,
+        "stamp": stamp,
+        "report": graph.report,
+        "sections": layout,
+    }).encode("utf-8")
+    start = align(len(MAGIC) + 8 + len(header))
+
+    # Write to a temporary file first so readers never see a partial one
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for name, typecode, values in sections:
+            f.seek(start + layout[name][0])
+            f.write(memoryview(values).cast("B"))
+        f.truncate(start + position)
+    os.replace(temporary, path)
+
+
+def load(path, stamp=None, directory=None):
+    """
+    Map the snapshot at `path` and return its graph, or None if there
+    is no usable snapshot or, when `stamp` is given, it does not match
+    the stamp the snapshot was written with.
+
+    Optional columns are read lazily from the CSV files in `directory`,
+    which defaults to the directory holding the snapshot.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(length))
+            if (header["version"] != VERSION or
+                    header["byteorder"] != sys.byteorder or
+                    (stamp is not None and header["stamp"] != stamp)):
+                return None
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, KeyError):
+        return None
+
+    start = align(len(MAGIC) + 8 + length)
+    view = memoryview(buffer)
+
+    def section(name):
+        offset, nbytes, typecode = header["sections"][name]
+        return view[start + offset:start + offset + nbytes].cast(typecode)
+
+    columns = {name: section(name) for name in Graph.ARRAYS}
+    for name in Graph.TABLES:
+        columns[name] = StringTable(
+            section(f"{name}.offsets"), section(f"{name}.data"))
+    graph = Graph(**columns, births=None, years=None)
+    ingest.attach_optional(graph, directory or os.path.dirname(path))
+    graph.buffer = buffer
+    graph.report = header["report"]
+    return graph
+
+
+def align(n):
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
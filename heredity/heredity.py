@@ -1,7 +1,15 @@
+import argparse
+import contextlib
 import csv
 import itertools
 import sys
 
+import junction
+import pruned
+import sampling
+import vectorized
+from tracing import Tracer
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -36,13 +44,88 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Samples counted by the sampling engines by default, and the number
+# of chains or independent draws they advance at once
+SAMPLES = 1000000
+CHAINS = 1000
+
+# Tracer recording work counts and phase timings, if tracing is on
+tracer = None
+
 
 def main():
+    parser = argparse.ArgumentParser(
+        description="Compute gene and trait probabilities for a family.")
+    parser.add_argument("data", help="CSV file of people and known traits")
+    parser.add_argument("--engine", choices=[*ENGINES, *SAMPLERS],
+                        default="junction",
+                        help="inference algorithm (default: junction)")
+    parser.add_argument("--samples", type=int, default=SAMPLES,
+                        help="samples for the sampling engines to count "
+                             f"(default: {SAMPLES})")
+    parser.add_argument("--chains", type=int, default=CHAINS,
+                        help="chains or draws to advance at once "
+                             f"(default: {CHAINS})")
+    parser.add_argument("--seconds", type=float,
+                        help="stop sampling after this many seconds")
+    parser.add_argument("--seed", type=int, help="random seed for sampling")
+    parser.add_argument("--trace", action="store_true",
+                        help="report work done and time per phase to "
+                             "standard error")
+    parser.add_argument("--log-every", type=int, default=0, metavar="N",
+                        help="with --trace, log every Nth joint evaluation")
+    args = parser.parse_args()
+
+    global tracer
+    if args.trace:
+        tracer = Tracer(args.log_every)
+    with phase("load"):
+        people = load_data(args.data)
+    errors = None
+    with phase("inference"):
+        try:
+            if args.engine in SAMPLERS:
+                sampler = SAMPLERS[args.engine]
+                probabilities, errors, samples, effective = sampler(
+                    people, args.samples, args.chains, args.seconds,
+                    args.seed)
+                print(f"Samples: {samples} ({effective:.0f} effective)")
+            else:
+                probabilities = ENGINES[args.engine](people)
+        except ValueError as e:
+            sys.exit(f"{args.engine}: {e}")
+
+    # Print results
+    with phase("output"):
+        for person in people:
+            print(f"{person}:")
+            for field in probabilities[person]:
+                print(f"  {field.capitalize()}:")
+                for value in probabilities[person][field]:
+                    p = probabilities[person][field][value]
+                    if errors is None:
+                        print(f"    {value}: {p:.4f}")
+                    else:
+                        error = errors[person][field][value]
+                        print(f"    {value}: {p:.4f} ± {error:.4f}")
+    if tracer is not None:
+        tracer.report()
+
+
+def phase(name):
+    """
+    Return a context manager timing phase `name` if tracing is on.
+    """
+    if tracer is None:
+        return contextlib.nullcontext()
+    return tracer.phase(name)
 
-    # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+
+def enumerate_probabilities(people):
+    """
+    Return each person's gene and trait distributions by enumerating
+    every assignment of genes and traits to `people`.
+    """
 
     # Keep track of gene and trait probabilities for each person
     probabilities = {
@@ -82,16 +165,59 @@ def main():
                 update(probabilities, one_gene, two_genes, have_trait, p)
 
     # Ensure probabilities sum to 1
-    normalize(probabilities)
+    with phase("normalize"):
+        normalize(probabilities)
+    return probabilities
+
+
+def junction_probabilities(people):
+    """
+    Return each person's gene and trait distributions computed exactly
+    by junction tree inference, in time linear in the size of families
+    shaped like trees.
+    """
+    return junction.marginals(people, PROBS, tracer=tracer)
 
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+
+def vectorized_probabilities(people):
+    """
+    Return each person's gene and trait distributions by enumerating
+    every assignment as `enumerate_probabilities` does, evaluating
+    blocks of assignments at once with NumPy.
+    """
+    return vectorized.marginals(people, PROBS, tracer=tracer)
+
+
+def pruned_probabilities(people):
+    """
+    Return each person's gene and trait distributions by enumerating
+    assignments depth first, parents before children, skipping known
+    traits' alternatives and anything already impossible.
+    """
+    return pruned.marginals(people, PROBS, tracer=tracer)
+
+
+def weighting_probabilities(people, samples=SAMPLES, chains=CHAINS,
+                            seconds=None, seed=None):
+    """
+    Return estimates of each person's gene and trait distributions by
+    likelihood weighting, their standard errors, and the number of
+    samples drawn and of effective samples. Raise ValueError if too
+    few samples are effective for the estimates to be trusted.
+    """
+    return sampling.likelihood_weighting(
+        people, PROBS, samples, chains, seconds, seed, tracer=tracer)
+
+
+def gibbs_probabilities(people, samples=SAMPLES, chains=CHAINS,
+                        seconds=None, seed=None):
+    """
+    Return estimates of each person's gene and trait distributions by
+    Gibbs sampling, their standard errors, and the number of samples
+    counted and of effective samples.
+    """
+    return sampling.gibbs(people, PROBS, samples, chains, seconds, seed,
+                          tracer=tracer)
 
 
 def load_data(filename):
@@ -174,7 +300,8 @@ def joint_probability(people, one_gene, two_genes, have_trait):
 
         trait_prob = PROBS['trait'][genes][has_trait]
         probability *= gene_prob * trait_prob
-    print(PROBS)
+    if tracer is not None:
+        tracer.joint(one_gene, two_genes, have_trait, probability)
     return probability
 
 
@@ -214,6 +341,20 @@ def normalize(probabilities):
                 probabilities[person][field][value] /= total
 
 
+# Inference algorithms selectable with --engine
+ENGINES = {
+    "enumerate": enumerate_probabilities,
+    "junction": junction_probabilities,
+    "pruned": pruned_probabilities,
+    "vectorized": vectorized_probabilities,
+}
+
+# Approximate inference engines, which also return standard errors
+SAMPLERS = {
+    "gibbs": gibbs_probabilities,
+    "weighting": weighting_probabilities,
+}
+
 
 if __name__ == "__main__":
     main()
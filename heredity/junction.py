@@ -0,0 +1,246 @@
+import heapq
+
+import numpy as np
+
+# Number of copies of the gene a person can have
+GENES = (0, 1, 2)
+
+# Most people one clique may hold: its table has 3 ** MAX_CLIQUE
+# entries, and families with loops can need far larger cliques
+MAX_CLIQUE = 14
+
+
+class JunctionTree():
+    """
+    Exact inference over a family treated as a Bayesian network, with
+    one variable per person for their number of copies of the gene.
+
+    Each person contributes a factor: the probability of their gene
+    count given their parents' (or unconditionally, for people without
+    parents), times the probability of their trait if it is known.
+    People are eliminated one at a time, each forming a clique with
+    the people still linked to them, and the cliques form a tree. One
+    pass of messages up the tree and one pass back down leave every
+    clique holding the joint distribution of its people, so every
+    person's marginal comes from a single calibration. For families
+    shaped like trees, cliques hold a child and two parents at most,
+    and the work grows linearly with the number of people. Families
+    that would need a clique of more than MAX_CLIQUE people raise
+    ValueError instead of running out of memory.
+    """
+
+    def __init__(self, people, probs, tracer=None):
+        self.people = people
+        self.probs = probs
+        self.tracer = tracer
+        self.names = list(people)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.build()
+
+    def build(self):
+        """
+        Choose an elimination order and build the cliques, their
+        parents in the tree, and their potentials.
+        """
+        n = len(self.names)
+        families = []
+        neighbors = [set() for _ in range(n)]
+        for name in self.names:
+            person = self.people[name]
+            scope = [self.index[name]]
+            if person["mother"] is not None or person["father"] is not None:
+                scope += [self.index[person["mother"]],
+                          self.index[person["father"]]]
+            families.append(tuple(scope))
+
+            # Parents of a child become linked to each other
+            for a in scope:
+                neighbors[a].update(b for b in scope if b != a)
+
+        # Greedily eliminate whoever leaves the smallest clique, skipping
+        # heap entries made stale by later eliminations
+        order = []
+        cliques = [None] * n
+        heap = [(len(neighbors[p]), p) for p in range(n)]
+        heapq.heapify(heap)
+        while heap:
+            degree, person = heapq.heappop(heap)
+            if (cliques[person] is not None or
+                    degree != len(neighbors[person])):
+                continue
+            cliques[person] = (person,) + tuple(sorted(neighbors[person]))
+            for a in neighbors[person]:
+                neighbors[a].discard(person)
+                neighbors[a].update(
+                    b for b in neighbors[person] if b != a)
+                heapq.heappush(heap, (len(neighbors[a]), a))
+            order.append(person)
+        position = {person: i for i, person in enumerate(order)}
+        largest = max(map(len, cliques), default=0)
+        if largest > MAX_CLIQUE:
+            raise ValueError(
+                f"junction tree needs a clique of {largest} people, more "
+                f"than {MAX_CLIQUE}, so exact inference would need "
+                f"3 ** {largest} entries; use a sampling engine such as "
+                "gibbs instead")
+
+        # A clique's parent is that of whoever in it is eliminated next
+        self.order = order
+        self.cliques = cliques
+        self.parents = [
+            min(clique[1:], key=position.get) if len(clique) > 1 else None
+            for clique in cliques
+        ]
+
+        # Each person's factor joins the clique of whoever in its scope
+        # is eliminated first, which holds the whole scope
+        self.potentials = [np.ones((3,) * len(clique)) for clique in cliques]
+        for person, scope in enumerate(families):
+            first = min(scope, key=position.get)
+            self.potentials[first] = self.potentials[first] * expand(
+                self.factor(person, scope), scope, cliques[first])
+
+    def factor(self, person, scope):
+        """
+        Return the table of `person`'s factor over `scope`, which is
+        the person followed by their mother and father, if any.
+        """
+        probs = self.probs
+        trait = self.people[self.names[person]]["trait"]
+        if trait is None:
+            evidence = np.ones(3)
+        else:
+            evidence = np.array([probs["trait"][g][trait] for g in GENES])
+        if len(scope) == 1:
+            return np.array([probs["gene"][g] for g in GENES]) * evidence
+        return inheritance(probs["mutation"]) * evidence[:, None, None]
+
+    def calibrate(self):
+        """
+        Pass messages up the tree and back down, and return the belief
+        of every clique: a table proportional to the probability of
+        each assignment of genes to its people together with all of
+        the evidence. Messages are rescaled to sum to 1 as they are
+        passed, so that large families do not underflow.
+        """
+        cliques, parents = self.cliques, self.parents
+        children = [[] for _ in cliques]
+        for clique, parent in enumerate(parents):
+            if parent is not None:
+                children[parent].append(clique)
+
+        # Upward: each clique sums out its own person for its parent
+        upward = [None] * len(cliques)
+        for clique in self.order:
+            belief = self.potentials[clique]
+            for child in children[clique]:
+                belief = belief * expand(
+                    upward[child], cliques[child][1:], cliques[clique])
+            upward[clique] = scaled(belief.sum(axis=0))
+
+        # Downward: each clique passes on everything but a child's own
+        # message, using products of the messages before and after it
+        downward = [None] * len(cliques)
+        beliefs = [None] * len(cliques)
+        for clique in reversed(self.order):
+            base = self.potentials[clique]
+            if parents[clique] is not None:
+                base = base * expand(
+                    downward[clique], cliques[clique][1:], cliques[clique])
+            incoming = [
+                expand(upward[child], cliques[child][1:], cliques[clique])
+                for child in children[clique]
+            ]
+            suffixes = [np.ones(1)]
+            for message in reversed(incoming):
+                suffixes.append(suffixes[-1] * message)
+            suffixes.reverse()
+            prefix = base
+            for child, message, suffix in zip(
+                    children[clique], incoming, suffixes[1:]):
+                downward[child] = scaled(marginal(
+                    prefix * suffix, cliques[clique], cliques[child][1:]))
+                prefix = prefix * message
+            beliefs[clique] = prefix
+        if self.tracer is not None:
+            self.tracer.count("cliques", len(cliques))
+            self.tracer.count("clique entries",
+                              sum(belief.size for belief in beliefs))
+            self.tracer.count("messages", sum(
+                2 for parent in parents if parent is not None))
+        return beliefs
+
+    def marginals(self):
+        """
+        Return each person's gene and trait distributions given the
+        evidence, in the form `heredity.main` prints.
+        """
+        beliefs = self.calibrate()
+        probabilities = {}
+        for person, name in enumerate(self.names):
+            genes = marginal(beliefs[person], self.cliques[person], (person,))
+            genes = genes / genes.sum()
+            trait = self.people[name]["trait"]
+            if trait is None:
+                has_trait = sum(
+                    genes[g] * self.probs["trait"][g][True] for g in GENES)
+            else:
+                has_trait = 1.0 if trait else 0.0
+            probabilities[name] = {
+                "gene": {g: float(genes[g]) for g in reversed(GENES)},
+                "trait": {True: float(has_trait),
+                          False: float(1 - has_trait)},
+            }
+        return probabilities
+
+
+def inheritance(mutation):
+    """
+    Return the 3x3x3 table whose entry [child, mother, father] is the
+    probability of a child having `child` copies of the gene given the
+    number of copies each parent has.
+    """
+    # Chance of passing the gene on from a parent with 0, 1 or 2 copies
+    passes = np.array([mutation, 0.5, 1 - mutation])
+    keeps = 1 - passes
+    table = np.empty((3, 3, 3))
+    table[2] = np.outer(passes, passes)
+    table[1] = np.outer(passes, keeps) + np.outer(keeps, passes)
+    table[0] = np.outer(keeps, keeps)
+    return table
+
+
+def expand(table, scope, target):
+    """
+    Return `table`, over the people in `scope`, with its axes arranged
+    to broadcast against a table over the people in `target`.
+    """
+    axes = [target.index(person) for person in scope]
+    shape = [1] * len(target)
+    for axis in axes:
+        shape[axis] = 3
+    order = np.argsort(axes)
+    return np.transpose(table, order).reshape(shape)
+
+
+def marginal(table, scope, keep):
+    """
+    Return `table`, over the people in `scope`, summed down to the
+    people in `keep`, in that order.
+    """
+    axes = list(range(len(scope)))
+    return np.einsum(table, axes, [scope.index(person) for person in keep])
+
+
+def scaled(table):
+    total = table.sum()
+    return table / total if total > 0 else table
+
+
+def marginals(people, probs, tracer=None):
+    """
+    Return each person's gene and trait distributions given the known
+    traits in `people`, computed exactly by junction tree inference,
+    counting cliques, their entries and messages passed in `tracer`.
+    """
+    return JunctionTree(people, probs, tracer).marginals()
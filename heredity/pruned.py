@@ -0,0 +1,108 @@
+from junction import GENES, inheritance
+
+
+def marginals(people, probs, tracer=None):
+    """
+    Return each person's gene and trait distributions given the known
+    traits in `people`, by enumerating assignments depth first.
+
+    People are assigned in an order that puts parents before their
+    children, so each person's factor is known as soon as they are
+    assigned: it comes from a 3x3x3 inheritance table built once from
+    `probs`. Known traits are fixed rather than enumerated, and any
+    partial assignment whose probability is already zero is dropped
+    along with everything that would extend it. Each assignment adds
+    the total probability of its completions to the marginals, so no
+    complete assignment is ever revisited person by person. Partial
+    assignments explored are counted in `tracer`, if given.
+    """
+    order = topological_order(people)
+    position = {name: i for i, name in enumerate(order)}
+    table = inheritance(probs["mutation"]).tolist()
+
+    parents = []
+    traits = []
+    for name in order:
+        person = people[name]
+        if person["mother"] is None and person["father"] is None:
+            parents.append(None)
+        else:
+            parents.append((position[person["mother"]],
+                            position[person["father"]]))
+        traits.append((True, False) if person["trait"] is None
+                      else (person["trait"],))
+
+    genes = [0] * len(order)
+    gene_totals = [dict.fromkeys(GENES, 0) for _ in order]
+    trait_totals = [{True: 0, False: 0} for _ in order]
+    explored = 0
+
+    def explore(i, probability):
+        """
+        Return the total probability of every complete assignment that
+        extends the genes assigned to the first `i` people, whose
+        probability so far is `probability`, adding each person's
+        share to the totals on the way.
+        """
+        nonlocal explored
+        explored += 1
+        if i == len(order):
+            return probability
+        total = 0
+        for gene in GENES:
+            if parents[i] is None:
+                gene_probability = probs["gene"][gene]
+            else:
+                mother, father = parents[i]
+                gene_probability = table[gene][genes[mother]][genes[father]]
+            if gene_probability == 0:
+                continue
+            genes[i] = gene
+            for trait in traits[i]:
+                p = (probability * gene_probability
+                     * probs["trait"][gene][trait])
+                if p == 0:
+                    continue
+                subtotal = explore(i + 1, p)
+                gene_totals[i][gene] += subtotal
+                trait_totals[i][trait] += subtotal
+                total += subtotal
+        return total
+
+    explore(0, 1.0)
+    if tracer is not None:
+        tracer.count("partial assignments", explored)
+
+    probabilities = {}
+    for i, name in enumerate(order):
+        gene_sum = sum(gene_totals[i].values())
+        trait_sum = sum(trait_totals[i].values())
+        probabilities[name] = {
+            "gene": {g: gene_totals[i][g] / gene_sum for g in reversed(GENES)},
+            "trait": {t: trait_totals[i][t] / trait_sum
+                      for t in (True, False)},
+        }
+    return {name: probabilities[name] for name in people}
+
+
+def topological_order(people):
+    """
+    Return the names in `people` ordered so that everyone comes after
+    their parents, keeping the file's order where it already does.
+    """
+    order = []
+    placed = set()
+
+    def place(name):
+        if name in placed:
+            return
+        placed.add(name)
+        person = people[name]
+        for parent in (person["mother"], person["father"]):
+            if parent is not None:
+                place(parent)
+        order.append(name)
+
+    for name in people:
+        place(name)
+    return order
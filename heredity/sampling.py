@@ -0,0 +1,330 @@
+import time
+
+import numpy as np
+
+from junction import GENES, inheritance
+from pruned import topological_order
+
+# Sweeps each Gibbs chain makes before its samples are counted
+BURN_IN = 50
+
+# Likelihood weighting reports estimates only from at least
+# MIN_EFFECTIVE effective samples, or MIN_EFFECTIVE_FRACTION of those
+# drawn if that is fewer: below both, a handful of samples carry
+# nearly all the weight, and neither the estimates nor their standard
+# errors can be trusted
+MIN_EFFECTIVE = 1000
+MIN_EFFECTIVE_FRACTION = 0.05
+
+
+def likelihood_weighting(people, probs, samples, chains=1000, seconds=None,
+                         seed=None, min_effective=MIN_EFFECTIVE,
+                         min_fraction=MIN_EFFECTIVE_FRACTION, tracer=None):
+    """
+    Estimate each person's gene and trait distributions given the known
+    traits in `people` by likelihood weighting, drawing `chains` samples
+    at a time until `samples` have been drawn or, if `seconds` is given,
+    that much time has passed.
+
+    Every sample draws each person's genes given their parents', in an
+    order that puts parents first, and is weighted by the probability
+    of the known traits given its genes. Unknown traits are not drawn:
+    each sample contributes the probability of the trait given its
+    genes instead, which gives the same estimate with less noise.
+    Samples are independent, but each known trait that is rare given
+    the family leaves fewer of them with much weight, so with many
+    known traits `gibbs` converges far faster.
+
+    Return the estimates, their standard errors in the same form, the
+    number of samples drawn, and the effective number of samples,
+    (sum of weights) ** 2 / (sum of squared weights). Raise ValueError
+    if the weights have collapsed: if that is below both
+    `min_effective` and `min_fraction` of the samples drawn. Batches
+    and samples drawn are counted in `tracer`, if given.
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    order = topological_order(people)
+    position = {name: i for i, name in enumerate(order)}
+    n = len(order)
+
+    parents = parent_positions(people, order, position)
+    prior = np.array([probs["gene"][g] for g in GENES])
+    table = inheritance(probs["mutation"])
+    has_trait = np.array([probs["trait"][g][True] for g in GENES])
+    with np.errstate(divide="ignore"):
+        likelihood = np.log(np.array([
+            [probs["trait"][g][False], probs["trait"][g][True]]
+            for g in GENES
+        ]))
+    known = [
+        (i, int(people[name]["trait"])) for i, name in enumerate(order)
+        if people[name]["trait"] is not None
+    ]
+
+    # Weighted sums of each person's gene indicators and chance of
+    # the trait, and of their squares, scaled by exp(-scale) so that
+    # large families do not underflow
+    scale = -np.inf
+    weight_sum = squared_sum = 0.0
+    gene_sums = np.zeros((n, 3))
+    gene_squares = np.zeros((n, 3))
+    trait_sums = np.zeros(n)
+    trait_cross = np.zeros(n)
+    trait_squares = np.zeros(n)
+
+    drawn = 0
+    while drawn < samples:
+        if seconds is not None and drawn and (
+                time.perf_counter() - start > seconds):
+            break
+        size = min(chains, samples - drawn)
+        genes = forward(rng, parents, prior, table, size)
+
+        log_weights = np.zeros(size)
+        for i, trait in known:
+            log_weights += likelihood[genes[i], trait]
+        if log_weights.max() > scale:
+            shift = np.exp(scale - log_weights.max())
+            scale = log_weights.max()
+            weight_sum *= shift
+            squared_sum *= shift ** 2
+            gene_sums *= shift
+            gene_squares *= shift ** 2
+            trait_sums *= shift
+            trait_cross *= shift ** 2
+            trait_squares *= shift ** 2
+        if scale == -np.inf:
+            # No sample so far fits the evidence at all
+            drawn += size
+            continue
+        weights = np.exp(log_weights - scale)
+
+        weight_sum += weights.sum()
+        squared_sum += (weights ** 2).sum()
+        for g in GENES:
+            indicator = genes == g
+            gene_sums[:, g] += indicator @ weights
+            gene_squares[:, g] += indicator @ weights ** 2
+        chance = has_trait[genes]
+        trait_sums += chance @ weights
+        trait_cross += chance @ weights ** 2
+        trait_squares += chance ** 2 @ weights ** 2
+        drawn += size
+
+    if tracer is not None:
+        tracer.count("batches", -(-drawn // chains))
+        tracer.count("samples drawn", drawn)
+
+    # Standard errors of the self-normalized estimates by the delta
+    # method: sqrt(sum(w^2 (x - mean)^2)) / sum(w), where x^2 = x for
+    # the gene indicators
+    genes = gene_sums / weight_sum
+    gene_errors = np.sqrt(np.maximum(
+        gene_squares - 2 * genes * gene_squares + genes ** 2 * squared_sum,
+        0)) / weight_sum
+    traits = trait_sums / weight_sum
+    trait_errors = np.sqrt(np.maximum(
+        trait_squares - 2 * traits * trait_cross + traits ** 2 * squared_sum,
+        0)) / weight_sum
+
+    effective = weight_sum ** 2 / squared_sum if squared_sum else 0.0
+    required = min(min_effective, min_fraction * drawn)
+    if effective < required:
+        raise ValueError(
+            f"sample weights collapsed: only {effective:.1f} of {drawn} "
+            f"samples are effective, fewer than {required:.0f}, so the "
+            "estimates cannot be trusted; draw more samples or use "
+            "Gibbs sampling")
+    return results(people, position, genes, traits,
+                   gene_errors, trait_errors) + (drawn, effective)
+
+
+def gibbs(people, probs, samples, chains=1000, seconds=None, seed=None,
+          burn_in=BURN_IN, tracer=None):
+    """
+    Estimate each person's gene and trait distributions given the known
+    traits in `people` by Gibbs sampling `chains` independent chains at
+    once, until `samples` have been counted over all chains or, if
+    `seconds` is given, that much time has passed.
+
+    Each chain starts from genes drawn given only the family, then
+    repeatedly redraws every person's genes given everyone else's,
+    which depends only on their parents, children and partners, and
+    on their own trait if it is known. The first `burn_in` sweeps are
+    not counted. Unknown traits contribute the probability of the
+    trait given the genes, as in `likelihood_weighting`. Unlike
+    likelihood weighting, every sample fits the known traits, so the
+    estimates do not degrade as more traits are known.
+
+    Standard errors come from the spread of the chains' own averages,
+    which are independent of each other however correlated each
+    chain's samples are. Return the estimates, their standard errors
+    in the same form, the number of samples counted, and the effective
+    number of samples: the fewest independent samples that would give
+    standard errors as small, over every gene count whose estimate is
+    neither 0 nor 1. Sweeps, counted or not, and genes redrawn are
+    counted in `tracer`, if given.
+    """
+    if chains < 2:
+        raise ValueError("standard errors need at least two chains")
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    order = topological_order(people)
+    position = {name: i for i, name in enumerate(order)}
+    n = len(order)
+    parents = parent_positions(people, order, position)
+
+    prior = np.array([probs["gene"][g] for g in GENES])
+    table = inheritance(probs["mutation"])
+    has_trait = np.array([probs["trait"][g][True] for g in GENES])
+    with np.errstate(divide="ignore"):
+        log_prior = np.log(prior)
+        log_table = np.log(table)
+        evidence = np.zeros((n, 3))
+        for i, name in enumerate(order):
+            trait = people[name]["trait"]
+            if trait is not None:
+                evidence[i] = np.log([probs["trait"][g][trait] for g in GENES])
+
+    # Each person's children, with whether the person is their mother
+    # and who their other parent is
+    children = [[] for _ in order]
+    for child, pair in enumerate(parents):
+        if pair is not None:
+            mother, father = pair
+            children[mother].append((child, True, father))
+            children[father].append((child, False, mother))
+
+    # Log factors with the person being redrawn on the first axis, so
+    # that indexing by other people's genes gives a row per gene count
+    given_child_as_mother = log_table.transpose(1, 0, 2)
+    given_child_as_father = log_table.transpose(2, 0, 1)
+
+    genes = forward(rng, parents, prior, table, chains)
+    gene_sums = np.zeros((n, 3, chains))
+    trait_sums = np.zeros((n, chains))
+    sweeps = total_sweeps = 0
+    while sweeps * chains < samples:
+        if seconds is not None and time.perf_counter() - start > seconds:
+            if sweeps:
+                break
+
+            # Count what the time allows rather than nothing at all
+            burn_in = 0
+        for i in range(n):
+            if parents[i] is None:
+                logits = np.repeat(log_prior[:, None], chains, axis=1)
+            else:
+                mother, father = parents[i]
+                logits = log_table[:, genes[mother], genes[father]]
+            logits += evidence[i][:, None]
+            for child, is_mother, other in children[i]:
+                if is_mother:
+                    logits += given_child_as_mother[
+                        :, genes[child], genes[other]]
+                else:
+                    logits += given_child_as_father[
+                        :, genes[child], genes[other]]
+
+            # Draw from the three gene counts in proportion to exp(logits)
+            weights = np.exp(logits - np.maximum(
+                np.maximum(logits[0], logits[1]), logits[2]))
+            below_one = weights[0]
+            below_two = below_one + weights[1]
+            u = rng.random(chains) * (below_two + weights[2])
+            genes[i] = (u >= below_one).astype(np.int64) + (u >= below_two)
+        total_sweeps += 1
+        if burn_in:
+            burn_in -= 1
+            continue
+        for g in GENES:
+            gene_sums[:, g] += genes == g
+        trait_sums += has_trait[genes]
+        sweeps += 1
+
+    if tracer is not None:
+        tracer.count("sweeps", total_sweeps)
+        tracer.count("genes redrawn", total_sweeps * n * chains)
+
+    # Each chain's averages, and the mean and standard error over chains
+    gene_means = gene_sums / sweeps
+    trait_means = trait_sums / sweeps
+    scale = np.sqrt(chains)
+    genes = gene_means.mean(axis=2)
+    gene_errors = gene_means.std(axis=2, ddof=1) / scale
+    traits = trait_means.mean(axis=1)
+    trait_errors = trait_means.std(axis=1, ddof=1) / scale
+
+    # An independent sample of a gene count with probability p would
+    # vary by p * (1 - p)
+    varying = gene_errors > 0
+    effective = float(np.min(
+        genes[varying] * (1 - genes[varying]) / gene_errors[varying] ** 2,
+        initial=sweeps * chains))
+    return results(people, position, genes, traits,
+                   gene_errors, trait_errors) + (sweeps * chains, effective)
+
+
+def parent_positions(people, order, position):
+    """
+    Return, for each person in `order`, the positions of their mother
+    and father in `order`, or None for people without parents.
+    """
+    parents = []
+    for name in order:
+        person = people[name]
+        if person["mother"] is None and person["father"] is None:
+            parents.append(None)
+        else:
+            parents.append((position[person["mother"]],
+                            position[person["father"]]))
+    return parents
+
+
+def forward(rng, parents, prior, table, size):
+    """
+    Return `size` independent draws of everyone's genes given only the
+    family, as an array with one row per person, drawing parents first.
+    """
+    genes = np.empty((len(parents), size), dtype=np.int64)
+    cumulative_prior = np.cumsum(prior)[:, None]
+    cumulative_table = np.cumsum(table, axis=0)
+    for i, pair in enumerate(parents):
+        if pair is None:
+            cumulative = cumulative_prior
+        else:
+            mother, father = pair
+            cumulative = cumulative_table[:, genes[mother], genes[father]]
+        u = rng.random(size)
+        genes[i] = (u * cumulative[-1] >= cumulative).sum(axis=0)
+
+    # Rounding can leave a draw past the last cumulative probability
+    return np.minimum(genes, 2)
+
+
+def results(people, position, genes, traits, gene_errors, trait_errors):
+    """
+    Return estimates and standard errors in the form `heredity.main`
+    prints from arrays indexed by position: gene arrays by position and
+    gene count, and trait arrays by position for the chance of the
+    trait. Known traits are reported as certain.
+    """
+    estimates = {}
+    errors = {}
+    for name in people:
+        i = position[name]
+        trait = people[name]["trait"]
+        if trait is None:
+            p, error = float(traits[i]), float(trait_errors[i])
+        else:
+            p, error = (1.0 if trait else 0.0), 0.0
+        estimates[name] = {
+            "gene": {g: float(genes[i, g]) for g in reversed(GENES)},
+            "trait": {True: p, False: 1 - p},
+        }
+        errors[name] = {
+            "gene": {g: float(gene_errors[i, g]) for g in reversed(GENES)},
+            "trait": {True: error, False: error},
+        }
+    return estimates, errors
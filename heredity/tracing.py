@@ -0,0 +1,66 @@
+import contextlib
+import sys
+import time
+
+
+class Tracer():
+    """
+    Opt-in instrumentation for heredity inference: counts of the work
+    each engine does, in whatever unit it works in, the seconds spent
+    in each phase, and a debug log of every `sample_every`-th joint
+    probability evaluation written to `log`. A `sample_every` of 0
+    turns the log off.
+    """
+
+    def __init__(self, sample_every=0, log=sys.stderr):
+        self.sample_every = sample_every
+        self.log = log
+        self.counts = {}
+        self.phases = {}
+
+        # Time spent in phases nested inside each phase being timed
+        self.nested = []
+
+    def count(self, unit, amount=1):
+        """
+        Add `amount` to the count of `unit`s of work done.
+        """
+        self.counts[unit] = self.counts.get(unit, 0) + amount
+
+    def joint(self, one_gene, two_genes, have_trait, probability):
+        """
+        Count one evaluation of a joint probability, logging it if it
+        is sampled.
+        """
+        self.count("joint evaluations")
+        evaluations = self.counts["joint evaluations"]
+        if self.sample_every and evaluations % self.sample_every == 0:
+            print(f"joint #{evaluations}: "
+                  f"one_gene={sorted(one_gene)} "
+                  f"two_genes={sorted(two_genes)} "
+                  f"have_trait={sorted(have_trait)} "
+                  f"p={probability:.6g}", file=self.log)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Add the time spent in the body of a `with` block to phase `name`,
+        less any time spent in phases nested inside it, so that every
+        second is reported once.
+        """
+        start = time.perf_counter()
+        self.nested.append(0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = (self.phases.get(name, 0)
+                                 + elapsed - self.nested.pop())
+            if self.nested:
+                self.nested[-1] += elapsed
+
+    def report(self, file=sys.stderr):
+        for unit, amount in self.counts.items():
+            print(f"{unit.capitalize()}: {amount}", file=file)
+        for name, seconds in self.phases.items():
+            print(f"{name}: {seconds:.4f} s", file=file)
@@ -0,0 +1,87 @@
+import numpy as np
+
+from junction import GENES, inheritance
+
+# Assignments of genes and traits evaluated at a time
+BLOCK_SIZE = 1 << 16
+
+
+def marginals(people, probs, block_size=BLOCK_SIZE, tracer=None):
+    """
+    Return each person's gene and trait distributions given the known
+    traits in `people`, by enumerating every assignment of genes and
+    unknown traits as `heredity.enumerate_probabilities` does, but
+    `block_size` assignments at a time.
+
+    Assignment number `k` gives person `i` the `i`-th base-3 digit of
+    `k` as their gene count and, for the `j`-th person whose trait is
+    unknown, the `j`-th bit of `k // 3 ** n` as their trait. Joint
+    probabilities come from lookup tables built once from `probs`,
+    and are added to the marginals with `np.add.at`. Blocks and
+    assignments evaluated are counted in `tracer`, if given.
+    """
+    names = list(people)
+    n = len(names)
+    index = {name: i for i, name in enumerate(names)}
+    unknown = [i for i, name in enumerate(names)
+               if people[name]["trait"] is None]
+
+    # Lookup tables: gene counts of people without parents, gene
+    # counts of children given their parents', and traits given genes
+    prior = np.array([probs["gene"][g] for g in GENES])
+    inherited = inheritance(probs["mutation"])
+    trait = np.array(
+        [[probs["trait"][g][False], probs["trait"][g][True]] for g in GENES])
+
+    founders = []
+    children = []
+    mothers = []
+    fathers = []
+    for i, name in enumerate(names):
+        if people[name]["mother"] is None and people[name]["father"] is None:
+            founders.append(i)
+        else:
+            children.append(i)
+            mothers.append(index[people[name]["mother"]])
+            fathers.append(index[people[name]["father"]])
+    known = np.array([
+        1 if people[name]["trait"] else 0 for name in names], dtype=np.int64)
+
+    powers = 3 ** np.arange(n, dtype=np.int64)
+    bits = 1 << np.arange(len(unknown), dtype=np.int64)
+    gene_totals = np.zeros((n, 3))
+    trait_totals = np.zeros((n, 2))
+    gene_rows = 3 * np.arange(n)
+    trait_rows = 2 * np.arange(n)
+    total = 3 ** n * 2 ** len(unknown)
+    for start in range(0, total, block_size):
+        k = np.arange(start, min(start + block_size, total), dtype=np.int64)
+        genes = (k[:, None] // powers) % 3
+        traits = np.broadcast_to(known, genes.shape).copy()
+        traits[:, unknown] = (k[:, None] // 3 ** n & bits) > 0
+
+        p = np.prod(prior[genes[:, founders]], axis=1)
+        p *= np.prod(inherited[genes[:, children], genes[:, mothers],
+                               genes[:, fathers]], axis=1)
+        p *= np.prod(trait[genes, traits], axis=1)
+
+        # Add to flattened totals, where person i's entries start at
+        # i * 3 for genes and i * 2 for traits
+        weights = np.repeat(p, n)
+        np.add.at(gene_totals.ravel(), (genes + gene_rows).ravel(), weights)
+        np.add.at(trait_totals.ravel(), (traits + trait_rows).ravel(),
+                  weights)
+        if tracer is not None:
+            tracer.count("blocks")
+            tracer.count("assignments", len(k))
+
+    gene_totals /= gene_totals.sum(axis=1, keepdims=True)
+    trait_totals /= trait_totals.sum(axis=1, keepdims=True)
+    return {
+        name: {
+            "gene": {g: float(gene_totals[i, g]) for g in reversed(GENES)},
+            "trait": {True: float(trait_totals[i, 1]),
+                      False: float(trait_totals[i, 0])},
+        }
+        for i, name in enumerate(names)
+    }
@@ -0,0 +1,131 @@
+import argparse
+import random
+import time
+
+from pagerank import DAMPING, iterate_pagerank
+
+# Convergence threshold for benchmark runs: pagerank.TOLERANCE is an
+# absolute change per page, which every page's rank falls below after
+# a single update once corpora have more than about 1000 pages
+TOLERANCE = 1e-10
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare iterative PageRank engines on a random corpus.")
+    parser.add_argument("--pages", type=int, default=100000)
+    parser.add_argument("--links", type=int, default=10,
+                        help="average number of links per page")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help=f"convergence threshold (default: {TOLERANCE})")
+    parser.add_argument("--skip-python", action="store_true",
+                        help="only time the sparse matrix engine")
+    parser.add_argument("--changes", type=int, default=0,
+                        help="then relink this many pages and compare an "
+                             "incremental update with a cold start")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    corpus = random_corpus(args.pages, args.links, args.seed)
+    print(f"Corpus of {args.pages} pages built in "
+          f"{time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    ranks = iterate_pagerank(corpus, DAMPING, args.tolerance)
+    print(f"sparse matrix: {time.perf_counter() - start:.2f} s")
+
+    if not args.skip_python:
+        start = time.perf_counter()
+        expected = dict_pagerank(corpus, DAMPING, args.tolerance)
+        print(f"python dicts:  {time.perf_counter() - start:.2f} s")
+        difference = max(abs(ranks[page] - expected[page]) for page in corpus)
+        print(f"largest difference: {difference:.2e}")
+
+    if args.changes:
+        compare_incremental(corpus, ranks, args.changes, args.tolerance,
+                            args.seed)
+
+
+def compare_incremental(corpus, ranks, changes, tolerance, seed=0):
+    """
+    Relink `changes` random pages of `corpus`, whose ranks are `ranks`,
+    then recompute PageRank from a cold start and incrementally from
+    `ranks`, and report the iterations the incremental update saved.
+    """
+    rng = random.Random(seed)
+    pages = sorted(corpus)
+    corpus = dict(corpus)
+    for page in rng.sample(pages, min(changes, len(pages))):
+        corpus[page] = set(rng.sample(pages, rng.randint(1, 10))) - {page}
+
+    cold_stats = {}
+    start = time.perf_counter()
+    expected = iterate_pagerank(corpus, DAMPING, tolerance, stats=cold_stats)
+    print(f"cold start:  {time.perf_counter() - start:.2f} s, "
+          f"{cold_stats['iterations']} iterations")
+
+    warm_stats = {}
+    start = time.perf_counter()
+    updated = iterate_pagerank(corpus, DAMPING, tolerance, previous=ranks,
+                               stats=warm_stats)
+    print(f"incremental: {time.perf_counter() - start:.2f} s, "
+          f"{warm_stats['iterations']:.2f} iterations")
+    print(f"iterations saved: "
+          f"{cold_stats['iterations'] - warm_stats['iterations']:.2f}")
+    difference = max(abs(updated[page] - expected[page]) for page in corpus)
+    print(f"largest difference: {difference:.2e}")
+
+
+def random_corpus(n, links, seed=0):
+    """
+    Return a corpus of `n` pages named by number, where each page links
+    to a random number of other pages averaging `links`, and about one
+    page in twenty has no links at all.
+    """
+    rng = random.Random(seed)
+    pages = [f"{i}.html" for i in range(n)]
+    corpus = {}
+    for page in pages:
+        if rng.random() < 0.05:
+            corpus[page] = set()
+        else:
+            count = min(n - 1, 1 + int(rng.expovariate(1 / links)))
+            corpus[page] = set(rng.sample(pages, count)) - {page}
+    return corpus
+
+
+def dict_pagerank(corpus, damping_factor, tolerance):
+    """
+    Return PageRank values computed with plain Python dictionaries,
+    as a reference for the sparse matrix engine.
+    """
+    n = len(corpus)
+    ranks = {page: 1 / n for page in corpus}
+    linked_from = {page: set() for page in corpus}
+    for page, links in corpus.items():
+        for link in links:
+            linked_from[link].add(page)
+    dangling = [page for page, links in corpus.items() if not links]
+
+    while True:
+        spread = sum(ranks[page] for page in dangling) / n
+        new_ranks = {
+            page: (1 - damping_factor) / n + damping_factor * (
+                spread + sum(
+                    ranks[parent] / len(corpus[parent])
+                    for parent in linked_from[page]
+                )
+            )
+            for page in corpus
+        }
+        change = max(abs(new_ranks[page] - ranks[page]) for page in corpus)
+        ranks = new_ranks
+        if change <= tolerance:
+            break
+    total = sum(ranks.values())
+    return {page: rank / total for page, rank in ranks.items()}
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import multiprocessing
+import os
+import re
+
+import numpy as np
+
+import linkcache
+from linkgraph import LinkGraph
+
+# Anchor tags the crawler follows, as in the original crawler
+ANCHOR = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+ANCHOR_START = re.compile(r"<a(?=\s|$)")
+
+# Characters of a page read and tokenized at a time
+CHUNK_SIZE = 1 << 16
+
+# Fewer changed pages than this are parsed without a process pool
+MIN_PARALLEL_PAGES = 256
+
+# Pages handed to a worker process at a time
+PAGES_PER_TASK = 64
+
+
+def crawl(directory, workers=None, cache=True, stats=None):
+    """
+    Parse the HTML pages in `directory` across a pool of `workers`
+    processes and return their link graph. Only links to other pages
+    in the corpus are kept.
+
+    If `cache` is true, the links parsed are saved to a cache file in
+    `directory`, and later crawls only parse the pages whose size or
+    modification time has changed since. If `stats` is a dictionary,
+    the number of pages and of pages parsed are recorded in it.
+    """
+    pages = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(".html"):
+                info = entry.stat()
+                pages.append((entry.name, info.st_mtime_ns, info.st_size))
+    pages.sort()
+    stamps = np.array([page[1:] for page in pages], dtype=np.int64)
+    pages = [page[0] for page in pages]
+
+    # Reuse the links of every page that is unchanged since the last crawl
+    path = os.path.join(directory, linkcache.FILENAME)
+    previous = linkcache.load(path) if cache else None
+    rows = [None] * len(pages)
+    targets = []
+    if previous is not None:
+        cached = {page: i for i, page in enumerate(previous.pages)}
+        targets = list(previous.targets)
+        for i, page in enumerate(pages):
+            j = cached.get(page)
+            if j is not None and (previous.stamps[j] == stamps[i]).all():
+                rows[i] = previous.row(j)
+    stale = [i for i, row in enumerate(rows) if row is None]
+
+    paths = [os.path.join(directory, pages[i]) for i in stale]
+    numbers = {target: i for i, target in enumerate(targets)}
+    for i, links in zip(stale, parse_all(paths, workers)):
+        row = []
+        for link in links:
+            if link not in numbers:
+                numbers[link] = len(numbers)
+                targets.append(link)
+            row.append(numbers[link])
+        rows[i] = np.array(row, dtype=np.int32)
+
+    current = linkcache.LinkCache.from_rows(pages, stamps, targets, rows)
+    if cache and (stale or previous is None or
+                  len(previous.pages) != len(pages)):
+        try:
+            linkcache.save(current, path)
+        except OSError:
+            # A read-only corpus just means no cache
+            pass
+    if stats is not None:
+        stats["pages"] = len(pages)
+        stats["parsed"] = len(stale)
+    return graph_of(current)
+
+
+def graph_of(cache):
+    """
+    Return the link graph of the pages in `cache`, keeping only links
+    to other pages in the corpus.
+    """
+    n = len(cache.pages)
+    lookup = {page: i for i, page in enumerate(cache.pages)}
+    numbers = np.array(
+        [lookup.get(target, -1) for target in cache.targets], dtype=np.int32)
+    sources = np.repeat(
+        np.arange(n, dtype=np.int32), np.diff(cache.offsets))
+    targets = numbers[cache.links]
+    known = (targets >= 0) & (targets != sources)
+    sources, targets = sources[known], targets[known]
+    order = np.lexsort((targets, sources))
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+    return LinkGraph(cache.pages, indptr, targets[order])
+
+
+def parse_all(paths, workers=None):
+    """
+    Yield the links of each page in `paths`, in order, parsing them
+    across a pool of `workers` processes when there are enough pages.
+    """
+    if workers == 1 or len(paths) < MIN_PARALLEL_PAGES:
+        yield from map(parse, paths)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap(parse, paths, chunksize=PAGES_PER_TASK)
+
+
+def parse(path):
+    """
+    Return the sorted link targets of the page at `path`, other than
+    the page itself.
+    """
+    links = extract_links(path)
+    links.discard(os.path.basename(path))
+    return sorted(links)
+
+
+def extract_links(path, chunk_size=CHUNK_SIZE):
+    """
+    Return the set of link targets of the anchor tags in the file at
+    `path`, reading it `chunk_size` characters at a time.
+    """
+    links = set()
+    carry = ""
+    with open(path) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            text = carry + chunk
+            end = 0
+            for match in ANCHOR.finditer(text):
+                links.add(match.group(1))
+                end = match.end()
+            carry = text[partial_anchor(text, end):]
+    return links
+
+
+def partial_anchor(text, start):
+    """
+    Return the position in `text`, at or after `start`, of the first
+    anchor tag cut off by the end of `text` that more text could
+    complete, or `len(text)` if there is none.
+
+    An unclosed tag can take its href from tags after it, so it is the
+    first such tag that must be carried over, not the last: nothing
+    after it can have matched without it matching first.
+    """
+    for match in ANCHOR_START.finditer(text, start):
+        i = match.start()
+        close = text.find(">", i)
+
+        # A tag closed before any href can never match
+        if close < 0 or text.find("href=\"", i, close) >= 0:
+            return i
+    if text.endswith("<", start):
+        return len(text) - 1
+    return len(text)
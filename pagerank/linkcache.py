@@ -0,0 +1,154 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+# Name of the cache file written into a corpus directory
+FILENAME = "pagerank.cache"
+
+MAGIC = b"PRCACHE1"
+VERSION = 1
+ALIGNMENT = 8
+
+# Sections of a cache file, each with its NumPy type
+SECTIONS = (
+    ("stamps", np.int64),
+    ("pages.offsets", np.int64),
+    ("pages.data", np.uint8),
+    ("targets.offsets", np.int64),
+    ("targets.data", np.uint8),
+    ("offsets", np.int64),
+    ("links", np.int32),
+)
+
+
+class LinkCache():
+    """
+    Links of every page of a corpus as last parsed, together with the
+    modification time and size, in nanoseconds and bytes, each page's
+    file had then.
+
+    Links name their targets through the `targets` table, which holds
+    every target once, including targets outside the corpus, so a page
+    added later still picks up the links that already pointed at it.
+    The links of page `i` are `links[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self, pages, stamps, targets, offsets, links):
+        self.pages = pages
+        self.stamps = stamps
+        self.targets = targets
+        self.offsets = offsets
+        self.links = links
+
+    @classmethod
+    def from_rows(cls, pages, stamps, targets, rows):
+        """
+        Build a cache from one array of target numbers per page, keeping
+        only the targets some page still links to.
+        """
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in rows], out=offsets[1:])
+        links = (np.concatenate(rows) if rows
+                 else np.zeros(0, dtype=np.int32))
+        used, links = np.unique(links, return_inverse=True)
+        return cls(pages, stamps, [targets[i] for i in used], offsets,
+                   links.astype(np.int32).ravel())
+
+    def row(self, i):
+        return self.links[self.offsets[i]:self.offsets[i + 1]]
+
+
+def save(cache, path):
+    """
+    Write `cache` to `path`.
+    """
+    pages_offsets, pages_data = encode(cache.pages)
+    targets_offsets, targets_data = encode(cache.targets)
+    arrays = {
+        "stamps": cache.stamps,
+        "pages.offsets": pages_offsets,
+        "pages.data": pages_data,
+        "targets.offsets": targets_offsets,
+        "targets.data": targets_data,
+        "offsets": cache.offsets,
+        "links": cache.links,
+    }
+    header = json.dumps({
+        "version": VERSION,
+        "byteorder": sys.byteorder,
+        "lengths": [int(arrays[name].size) for name, _ in SECTIONS],
+    }).encode("utf-8")
+
+    # Write to a temporary file first so readers never see a partial one
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for name, dtype in SECTIONS:
+            f.seek(align(f.tell()))
+            f.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+    os.replace(temporary, path)
+
+
+def load(path):
+    """
+    Return the cache saved at `path`, or None if there is no usable
+    cache there.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(length))
+            if (header["version"] != VERSION or
+                    header["byteorder"] != sys.byteorder):
+                return None
+            f.seek(0)
+            contents = f.read()
+
+        arrays = {}
+        position = len(MAGIC) + 8 + length
+        for (name, dtype), count in zip(SECTIONS, header["lengths"]):
+            position = align(position)
+            arrays[name] = np.frombuffer(
+                contents, dtype=dtype, count=count, offset=position)
+            position += arrays[name].nbytes
+    except (OSError, ValueError, KeyError):
+        return None
+    return LinkCache(
+        decode(arrays["pages.offsets"], arrays["pages.data"]),
+        arrays["stamps"].reshape(-1, 2),
+        decode(arrays["targets.offsets"], arrays["targets.data"]),
+        arrays["offsets"],
+        arrays["links"],
+    )
+
+
+def encode(strings):
+    """
+    Return the UTF-8 bytes of `strings` laid end to end, together with
+    the offsets at which each one starts and the last one ends.
+    """
+    encoded = [
+        string.encode("utf-8", "surrogateescape") for string in strings
+    ]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def decode(offsets, data):
+    data = data.tobytes()
+    offsets = offsets.tolist()
+    return [
+        data[offsets[i]:offsets[i + 1]].decode("utf-8", "surrogateescape")
+        for i in range(len(offsets) - 1)
+    ]
+
+
+def align(n):
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
@@ -0,0 +1,117 @@
+import numpy as np
+from scipy import sparse
+
+
+class LinkGraph():
+    """
+    Link structure of a corpus with pages numbered 0..n-1 in sorted
+    order. Out-links are stored in compressed sparse row form: the
+    pages linked to by page `i` are `indices[indptr[i]:indptr[i + 1]]`.
+    """
+
+    def __init__(self, pages, indptr, indices):
+        self.pages = pages
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build a link graph from a dictionary mapping each page to the
+        set of pages it links to. Links to pages outside the corpus
+        are ignored.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        lookup = index.get
+        counts = []
+        indices = []
+        for page in pages:
+            links = corpus[page]
+            counts.append(len(links))
+            indices.extend([lookup(link, -1) for link in links])
+        indices = np.array(indices, dtype=np.int32)
+
+        # Drop links that lead outside the corpus
+        known = indices >= 0
+        sources = np.repeat(np.arange(len(pages)), counts)[known]
+        indptr = np.zeros(len(pages) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(pages)), out=indptr[1:])
+        return cls(pages, indptr, indices[known])
+
+    @classmethod
+    def of(cls, corpus):
+        """
+        Return `corpus` if it is already a link graph, or build one from
+        it if it is a dictionary of links.
+        """
+        if isinstance(corpus, cls):
+            return corpus
+        return cls.from_corpus(corpus)
+
+    def to_corpus(self):
+        """
+        Return the dictionary mapping each page to the set of pages it
+        links to.
+        """
+        pages = self.pages
+        indptr, indices = self.indptr, self.indices.tolist()
+        return {
+            page: {pages[j] for j in indices[indptr[i]:indptr[i + 1]]}
+            for i, page in enumerate(pages)
+        }
+
+    def edges(self):
+        """
+        Return the links as a compact edge list: an (m, 2) array whose
+        rows are (source, target) page numbers.
+        """
+        sources = np.repeat(
+            np.arange(len(self), dtype=np.int32), self.out_degree)
+        return np.column_stack((sources, self.indices))
+
+    def __len__(self):
+        return len(self.pages)
+
+    @property
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+    @property
+    def dangling(self):
+        """
+        Boolean mask of pages with no links, which the random surfer
+        treats as linking to every page in the corpus.
+        """
+        return self.out_degree == 0
+
+    def links_from(self, pages):
+        """
+        Return the pages linked to by each of `pages`, concatenated.
+        """
+        starts = self.indptr[pages]
+        counts = self.indptr[pages + 1] - starts
+        offsets = np.cumsum(counts) - counts
+        return self.indices[
+            np.repeat(starts - offsets, counts) + np.arange(counts.sum())]
+
+    def transition_matrix(self):
+        """
+        Return the sparse matrix `M` with `M[j, i] = 1 / out_degree(i)`
+        for every link from page `i` to page `j`, so that `M @ rank`
+        spreads each page's rank evenly over its links. Columns of
+        dangling pages are left empty.
+        """
+        n = len(self)
+        degree = self.out_degree
+        weights = np.repeat(
+            1 / np.maximum(degree, 1), degree).astype(np.float64)
+        links = sparse.csr_matrix(
+            (weights, self.indices, self.indptr), shape=(n, n))
+        return links.T.tocsr()
+
+    def ranks(self, vector):
+        """
+        Return a dictionary mapping each page to its entry in `vector`.
+        """
+        return dict(zip(self.pages, np.asarray(vector).tolist()))
@@ -0,0 +1,266 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import crawler
+from tracing import Trace
+
+MAGIC = b"PREDGES1"
+VERSION = 1
+
+# Bytes reserved at the start of an edge file for its header
+HEADER_SIZE = 4096
+
+# Links read from disk at a time while ranking
+BLOCK_EDGES = 1 << 22
+
+# Pages whose links are generated at a time by `generate`
+BLOCK_PAGES = 1 << 16
+
+# Share of generated pages without links
+DANGLING_SHARE = 0.05
+
+DAMPING = 0.85
+TOLERANCE = 1e-8
+MAX_ITERATIONS = 1000
+
+
+class EdgeFile():
+    """
+    Link graph stored on disk: the out-degree of each of `pages` pages,
+    followed by the links as (source, target) pairs of page numbers in
+    no particular order. Both are memory-mapped rather than read, so
+    only the parts being used are held in memory.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not an edge file")
+            header = json.loads(f.read(HEADER_SIZE - len(MAGIC)))
+        if header["version"] != VERSION:
+            raise ValueError(f"{path} has unsupported version")
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was written on another platform")
+        self.pages = header["pages"]
+        self.links = header["links"]
+        self.names = header.get("names")
+        self.degrees = np.memmap(path, dtype=np.int32, mode="r",
+                                 offset=HEADER_SIZE, shape=(self.pages,))
+        self.edges = np.memmap(
+            path, dtype=np.int32, mode="r",
+            offset=HEADER_SIZE + 4 * self.pages, shape=(self.links, 2))
+
+    def blocks(self, size=BLOCK_EDGES):
+        """
+        Yield successive (sources, targets) arrays of at most `size`
+        links each.
+        """
+        for start in range(0, self.links, size):
+            block = np.array(self.edges[start:start + size])
+            yield block[:, 0], block[:, 1]
+
+
+def write(path, pages, blocks, names=None):
+    """
+    Write an edge file for `pages` pages to `path`, streaming the links
+    from `blocks`, an iterable of (sources, targets) arrays. `names`,
+    if given, is the file next to `path` naming each page on its own
+    line.
+    """
+    degrees = np.zeros(pages, dtype=np.int64)
+    links = 0
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.seek(HEADER_SIZE + 4 * pages)
+        for sources, targets in blocks:
+            edges = np.column_stack((sources, targets)).astype(np.int32)
+            f.write(edges.tobytes())
+            degrees += np.bincount(sources, minlength=pages)
+            links += len(edges)
+
+        header = json.dumps({
+            "version": VERSION,
+            "byteorder": sys.byteorder,
+            "pages": pages,
+            "links": links,
+            "names": names,
+        }).encode("utf-8")
+        if len(MAGIC) + len(header) > HEADER_SIZE:
+            raise ValueError("edge file header is too long")
+        f.seek(0)
+        f.write(MAGIC + header.ljust(HEADER_SIZE - len(MAGIC)))
+        f.write(degrees.astype(np.int32).tobytes())
+    os.replace(temporary, path)
+
+
+def power_iteration(edges, damping_factor, tolerance, max_iterations,
+                    block_size=BLOCK_EDGES, trace=None):
+    """
+    Return the PageRank vector of the graph in the edge file `edges`
+    and the number of iterations taken, stopping as the in-memory
+    `solvers.power_iteration` does.
+
+    Each iteration streams the links from disk `block_size` at a time,
+    so only a few vectors with one value per page stay in memory
+    however many links there are.
+    """
+    n = edges.pages
+    start = time.perf_counter()
+    degrees = np.asarray(edges.degrees)
+    dangling = degrees == 0
+    share = 1 / np.maximum(degrees, 1)
+    del degrees
+    if trace is not None:
+        trace.phase("matrix", time.perf_counter() - start)
+
+    start = time.perf_counter()
+    teleport = (1 - damping_factor) / n
+    rank = np.full(n, 1 / n)
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        spread = rank * share
+        new_rank = np.zeros(n)
+        for sources, targets in edges.blocks(block_size):
+            new_rank += np.bincount(
+                targets, weights=spread[sources], minlength=n)
+        new_rank *= damping_factor
+        new_rank += teleport + damping_factor * rank[dangling].sum() / n
+
+        difference = new_rank - rank
+        change = np.abs(difference).max()
+        rank = new_rank
+        if trace is not None:
+            trace.record(iterations, time.perf_counter() - start,
+                         difference, tolerance)
+        if change <= tolerance:
+            break
+
+    if trace is not None:
+        trace.phase("solve", time.perf_counter() - start)
+    return rank / rank.sum(), iterations
+
+
+def generate(path, pages, links=10, seed=0, block_pages=BLOCK_PAGES):
+    """
+    Write a random edge file of `pages` pages to `path`, for testing.
+
+    Pages average `links` distinct links each, with DANGLING_SHARE of
+    them having none, and links favour low-numbered pages, so that a
+    few pages are far more popular than the rest, as on the web. The
+    links are generated `block_pages` pages at a time, so graphs much
+    larger than memory can be written.
+    """
+    rng = np.random.default_rng(seed)
+
+    def blocks():
+        for first in range(0, pages, block_pages):
+            count = min(block_pages, pages - first)
+            degrees = np.minimum(
+                rng.geometric(1 / links, size=count), pages - 1)
+            degrees[rng.random(count) < DANGLING_SHARE] = 0
+            sources = np.repeat(
+                np.arange(first, first + count, dtype=np.int64), degrees)
+            targets = (pages * rng.random(len(sources)) ** 2).astype(
+                np.int64)
+
+            # Drop links to the page itself and repeated links
+            keys = np.sort(sources * pages + targets)
+            sources, targets = keys // pages, keys % pages
+            keep = sources != targets
+            keep[1:] &= keys[1:] != keys[:-1]
+            yield sources[keep], targets[keep]
+
+    write(path, pages, blocks())
+
+
+def convert(directory, path):
+    """
+    Crawl the corpus in `directory` and write its links to the edge
+    file `path`, with its page names in `path` + ".pages".
+    """
+    graph = crawler.crawl(directory)
+    names = f"{path}.pages"
+    with open(names, "w", encoding="utf-8") as f:
+        for page in graph.pages:
+            f.write(page + "\n")
+    edges = graph.edges()
+    write(path, len(graph), [(edges[:, 0], edges[:, 1])],
+          names=os.path.basename(names))
+
+
+def page_names(edges, path):
+    """
+    Return the list of page names of the edge file at `path`, or None
+    if its pages are only numbered.
+    """
+    if edges.names is None:
+        return None
+    names = os.path.join(os.path.dirname(path), edges.names)
+    with open(names, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rank link graphs too large for memory from an "
+                    "on-disk edge file.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser(
+        "generate", help="write a random edge file for testing")
+    command.add_argument("path")
+    command.add_argument("--pages", type=int, default=1000000)
+    command.add_argument("--links", type=int, default=10,
+                         help="average number of links per page")
+    command.add_argument("--seed", type=int, default=0)
+
+    command = commands.add_parser(
+        "convert", help="write the edge file of a corpus directory")
+    command.add_argument("corpus")
+    command.add_argument("path")
+
+    command = commands.add_parser("rank", help="rank an edge file")
+    command.add_argument("path")
+    command.add_argument("--tolerance", type=float, default=TOLERANCE)
+    command.add_argument("--block-size", type=int, default=BLOCK_EDGES,
+                         help="links read from disk at a time")
+    command.add_argument("--top", type=int, default=10,
+                         help="number of best-ranked pages to print")
+    command.add_argument("--trace",
+                         help="write per-iteration convergence records to "
+                              "this file, as CSV if it ends in .csv and "
+                              "JSON otherwise")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "generate":
+        generate(args.path, args.pages, args.links, args.seed)
+        edges = EdgeFile(args.path)
+        print(f"Wrote {edges.pages} pages and {edges.links} links in "
+              f"{time.perf_counter() - start:.2f} s")
+    elif args.command == "convert":
+        convert(args.corpus, args.path)
+    else:
+        edges = EdgeFile(args.path)
+        trace = Trace()
+        rank, iterations = power_iteration(
+            edges, DAMPING, args.tolerance, MAX_ITERATIONS,
+            args.block_size, trace)
+        print(f"Ranked {edges.pages} pages and {edges.links} links in "
+              f"{iterations} iterations, {time.perf_counter() - start:.2f} s")
+        names = page_names(edges, args.path)
+        for page in np.argsort(-rank)[:args.top]:
+            name = names[page] if names is not None else page
+            print(f"  {name}: {rank[page]:.6f}")
+        if args.trace:
+            trace.save(args.trace)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,97 @@
-import os
-import random
-import re
-import sys
+import argparse
+import time
+
+import numpy as np
+from scipy import sparse, stats
+
+import crawler
+from linkgraph import LinkGraph
+from solvers import (personalized_iteration, power_iteration, push,
+                     sample_surfers, update_iteration)
+from tracing import Trace
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Random surfers walking in parallel while sampling, the fewest pages
+# each one samples, and the steps each takes before it starts sampling
+SURFERS = 1000
+MIN_STEPS = 100
+BURN_IN = 50
+
+# Groups of surfers compared to estimate sampling error, and so the
+# fewest surfers that walk however few pages are sampled
+GROUPS = 20
+
+# Confidence level of the intervals reported for sampled ranks
+CONFIDENCE = 0.95
+
+# Iterative PageRank stops once no value moves by more than TOLERANCE,
+# or after MAX_ITERATIONS updates
+TOLERANCE = 0.001
+MAX_ITERATIONS = 1000
+
+# Personalized PageRank by local push leaves at most this much rank
+# per link unplaced on each page
+PUSH_EPSILON = 1e-6
+
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
+    parser = argparse.ArgumentParser(
+        description="Rank the pages of a corpus by PageRank.")
+    parser.add_argument("corpus")
+    parser.add_argument("--profile", action="store_true",
+                        help="summarize the time spent in each phase")
+    parser.add_argument("--trace",
+                        help="write per-iteration convergence records to "
+                             "this file, as CSV if it ends in .csv and "
+                             "JSON otherwise")
+    args = parser.parse_args()
+
+    trace = Trace()
+    crawl_stats = {}
+    start = time.perf_counter()
+    corpus = crawler.crawl(args.corpus, stats=crawl_stats)
+    trace.phase("crawl", time.perf_counter() - start)
+
+    start = time.perf_counter()
+    intervals = sample_pagerank_interval(corpus, DAMPING, SAMPLES)
+    trace.phase("sample", time.perf_counter() - start)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
-    for page in sorted(ranks):
-        print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    for page in sorted(intervals):
+        rank, error = intervals[page]
+        print(f"  {page}: {rank:.4f} ± {error:.4f}")
+    ranks = iterate_pagerank(corpus, DAMPING, trace=trace)
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
 
+    if args.profile:
+        print("Profile")
+        print(f"  crawl:  {trace.phases['crawl']:.3f} s, "
+              f"{crawl_stats['pages']} pages, "
+              f"{crawl_stats['parsed']} parsed")
+        print(f"  matrix: {trace.phases['matrix']:.3f} s, "
+              f"{len(corpus.indices)} links")
+        print(f"  solve:  {trace.phases['solve']:.3f} s, "
+              f"{len(trace.iterations)} iterations, final residual "
+              f"{trace.iterations[-1]['residual']:.2e}")
+        print(f"  sample: {trace.phases['sample']:.3f} s, "
+              f"{SAMPLES} samples")
+    if args.trace:
+        trace.save(args.trace)
+
 
 def crawl(directory):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
-    """
-    pages = dict()
-
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
-
-    # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
-        )
 
-    return pages
+    Pages are parsed in parallel by `crawler.crawl`, which returns the
+    links as a compact link graph; use that directly for large corpora.
+    """
+    return crawler.crawl(directory).to_corpus()
 
 
 def transition_model(corpus, page, damping_factor):
@@ -57,10 +103,19 @@ def transition_model(corpus, page, damping_factor):
     linked to by `page`. With probability `1 - damping_factor`, choose
     a link at random chosen from all pages in the corpus.
     """
-    raise NotImplementedError
+    links = corpus[page]
+    if not links:
+        return {other: 1 / len(corpus) for other in corpus}
+
+    distribution = {
+        other: (1 - damping_factor) / len(corpus) for other in corpus
+    }
+    for link in links:
+        distribution[link] += damping_factor / len(links)
+    return distribution
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, seed=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
@@ -68,11 +123,44 @@ def sample_pagerank(corpus, damping_factor, n):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    Many surfers walk at once, so `n` can be in the millions; pass
+    `seed` for reproducible results.
+    """
+    ranks = sample_pagerank_interval(corpus, damping_factor, n, seed)
+    return {page: rank for page, (rank, _) in ranks.items()}
+
+
+def sample_pagerank_interval(corpus, damping_factor, n, seed=None):
+    """
+    Return a dictionary mapping each page to its PageRank estimated by
+    sampling `n` pages, as in `sample_pagerank`, together with the
+    half-width of a 95% confidence interval around that estimate. At
+    least GROUPS surfers walk, however small `n` is, so that there
+    are GROUPS groups to compare unless `n` is smaller still; with
+    fewer than 2 the interval cannot be estimated and is NaN. The
+    groups' spread is scaled by Student's t for one degree of freedom
+    fewer than there are groups, since so few groups understate it.
+
+    `corpus` may also be a link graph, such as one from `crawler.crawl`.
     """
-    raise NotImplementedError
+    graph = LinkGraph.of(corpus)
+    surfers = max(GROUPS, min(SURFERS, n // MIN_STEPS))
+    rank, error = sample_surfers(graph, damping_factor, n, surfers=surfers,
+                                 groups=GROUPS, burn_in=BURN_IN, seed=seed)
 
+    # sample_surfers forms no more groups than it has samples
+    groups = min(GROUPS, max(1, n))
+    t = stats.t.ppf((1 + CONFIDENCE) / 2, groups - 1) if groups > 1 else 0
+    return {
+        page: (float(value), float(t * spread))
+        for page, value, spread in zip(graph.pages, rank, error)
+    }
 
-def iterate_pagerank(corpus, damping_factor):
+
+def iterate_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                     max_iterations=MAX_ITERATIONS, previous=None,
+                     stats=None, trace=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -80,8 +168,108 @@ def iterate_pagerank(corpus, damping_factor):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    Updates are sparse matrix-vector products over the corpus's link
+    matrix. Iteration stops once no value changes by more than
+    `tolerance`, or after `max_iterations` updates. The default of
+    0.001 comes from the specification and suits corpora of a few
+    pages only: ranks average 1 / N, so with more than about 1000
+    pages no value can move by that much and one update is all that
+    is done. Pass a tolerance well below 1 / N, such as 1e-10, for
+    larger corpora.
+
+    If `previous` maps pages to their ranks before the corpus changed,
+    those ranks are the starting point and only the pages they no
+    longer fit are updated. If `stats` is a dictionary, the number of
+    iterations, counting partial updates as a fraction of one, is
+    recorded in it. If `trace` is a `Trace`, the time spent and every
+    iteration are recorded in it.
+    """
+    graph = LinkGraph.of(corpus)
+    if previous is None:
+        rank, iterations = power_iteration(
+            graph, damping_factor, tolerance, max_iterations, trace)
+    else:
+        start = np.array(
+            [previous.get(page, 1 / len(graph)) for page in graph.pages])
+        rank, iterations = update_iteration(
+            graph, damping_factor, tolerance, max_iterations,
+            start / start.sum(), trace)
+    if stats is not None:
+        stats["iterations"] = iterations
+    return graph.ranks(rank)
+
+
+def personalized_pagerank(corpus, damping_factor, seeds,
+                          epsilon=PUSH_EPSILON):
+    """
+    Return PageRank values personalized to `seeds`: a surfer who gets
+    bored jumps back to one of the seed pages rather than to any page.
+    `seeds` is a page, a collection of pages weighted equally, or a
+    dictionary mapping pages to weights.
+
+    Return a dictionary of only the pages with a nonzero estimate,
+    best first. Values are computed by local push, so the time taken
+    depends on how many pages are ranked rather than on the size of
+    the corpus. Smaller `epsilon` gives better estimates at more cost;
+    estimates never exceed the true values, and fall short of them by
+    one minus their sum in total.
+    """
+    graph = LinkGraph.of(corpus)
+    index = {page: i for i, page in enumerate(graph.pages)}
+    weights = teleport_weights(seeds)
+    estimate = push(
+        graph, damping_factor,
+        {index[page]: weight for page, weight in weights.items()}, epsilon)
+    ranked = sorted(estimate.items(), key=lambda item: -item[1])
+    return {graph.pages[i]: float(value) for i, value in ranked}
+
+
+def topic_pagerank(corpus, damping_factor, topics, tolerance=TOLERANCE,
+                   max_iterations=MAX_ITERATIONS, trace=None):
+    """
+    Return topic-sensitive PageRank values for every topic in `topics`,
+    a dictionary mapping each topic to its seeds, given as for
+    `personalized_pagerank`.
+
+    Return a dictionary mapping each topic to a dictionary of PageRank
+    values for every page. All topics are computed together by one
+    sparse matrix-matrix product per iteration, stopping as
+    `iterate_pagerank` does. If `trace` is a `Trace`, the time spent
+    and every iteration are recorded in it.
+    """
+    graph = LinkGraph.of(corpus)
+    index = {page: i for i, page in enumerate(graph.pages)}
+    rows, columns, values = [], [], []
+    for column, seeds in enumerate(topics.values()):
+        for page, weight in teleport_weights(seeds).items():
+            rows.append(index[page])
+            columns.append(column)
+            values.append(weight)
+    personalization = sparse.csr_matrix(
+        (values, (rows, columns)), shape=(len(graph), len(topics)))
+    ranks, _ = personalized_iteration(
+        graph, damping_factor, personalization, tolerance, max_iterations,
+        trace)
+    return {
+        topic: graph.ranks(ranks[:, column])
+        for column, topic in enumerate(topics)
+    }
+
+
+def teleport_weights(seeds):
+    """
+    Return a dictionary mapping each seed page to the probability of
+    teleporting to it, given `seeds` as for `personalized_pagerank`.
     """
-    raise NotImplementedError
+    if isinstance(seeds, str):
+        seeds = [seeds]
+    if not isinstance(seeds, dict):
+        seeds = dict.fromkeys(seeds, 1)
+    total = sum(seeds.values())
+    if not seeds or total <= 0:
+        raise ValueError("seeds must have positive total weight")
+    return {page: weight / total for page, weight in seeds.items()}
 
 
 if __name__ == "__main__":
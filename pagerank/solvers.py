@@ -0,0 +1,266 @@
+import time
+from collections import deque
+
+import numpy as np
+from scipy import sparse
+
+# Largest share of the corpus updated selectively by update_iteration;
+# beyond it, a full sparse update is cheaper
+LOCAL_FRACTION = 0.1
+
+
+def power_iteration(graph, damping_factor, tolerance, max_iterations,
+                    trace=None):
+    """
+    Return the PageRank vector of `graph` and the number of iterations
+    taken, repeatedly applying the random surfer model from a uniform
+    start until no value changes by more than `tolerance` or
+    `max_iterations` have run.
+
+    If `trace` is given, the time spent and every iteration are
+    recorded in it.
+    """
+    n = len(graph)
+    start = time.perf_counter()
+    matrix = graph.transition_matrix()
+    dangling = graph.dangling
+    teleport = (1 - damping_factor) / n
+    if trace is not None:
+        trace.phase("matrix", time.perf_counter() - start)
+
+    start = time.perf_counter()
+    rank = np.full(n, 1 / n)
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        new_rank = teleport + damping_factor * (
+            matrix @ rank + rank[dangling].sum() / n)
+        difference = new_rank - rank
+        change = np.abs(difference).max()
+        rank = new_rank
+        if trace is not None:
+            trace.record(iterations, time.perf_counter() - start,
+                         difference, tolerance)
+        if change <= tolerance:
+            break
+
+    if trace is not None:
+        trace.phase("solve", time.perf_counter() - start)
+    return rank / rank.sum(), iterations
+
+
+def update_iteration(graph, damping_factor, tolerance, max_iterations,
+                     rank, trace=None):
+    """
+    Return the PageRank vector of `graph` and the work spent on it,
+    warm-starting from the estimate `rank`, such as the ranks of the
+    corpus before a few pages changed.
+
+    After a full update, only the pages linked to by pages that moved
+    by more than `tolerance` are updated next, in place, Gauss-Seidel
+    style, as long as they are at most LOCAL_FRACTION of the corpus.
+    Once nothing moves, a full update checks the result, so iteration
+    stops under the same test as `power_iteration`. Work is counted in
+    full iterations: updating `k` of `n` pages counts as `k / n`.
+    If `trace` is given, the time spent and every update, full or
+    partial, are recorded in it.
+    """
+    n = len(graph)
+    start = time.perf_counter()
+    matrix = graph.transition_matrix()
+    dangling = graph.dangling
+    teleport = (1 - damping_factor) / n
+    if trace is not None:
+        trace.phase("matrix", time.perf_counter() - start)
+
+    start = time.perf_counter()
+    rank = np.array(rank, dtype=np.float64)
+    dangling_rank = rank[dangling].sum()
+    work = 0.0
+    pages = None
+    while work < max_iterations:
+        if pages is None:
+            new_rank = teleport + damping_factor * (
+                matrix @ rank + dangling_rank / n)
+            change = new_rank - rank
+            moved = np.flatnonzero(np.abs(change) > tolerance)
+            rank = new_rank
+            dangling_rank = rank[dangling].sum()
+            work += 1
+        else:
+            values = teleport + damping_factor * (
+                matrix[pages] @ rank + dangling_rank / n)
+            change = values - rank[pages]
+            rank[pages] = values
+            dangling_rank += change[dangling[pages]].sum()
+            work += len(pages) / n
+            moved = pages[np.abs(change) > tolerance]
+        if trace is not None:
+            trace.record(work, time.perf_counter() - start, change,
+                         tolerance)
+        if pages is None and len(moved) == 0:
+            break
+
+        # Only pages linked to by a page that moved can move next; if
+        # none did, or too many may, update every page
+        pages = None
+        if 0 < len(moved) <= LOCAL_FRACTION * n:
+            marked = np.zeros(n, dtype=bool)
+            marked[graph.links_from(moved)] = True
+            pages = np.flatnonzero(marked)
+            if len(pages) > LOCAL_FRACTION * n:
+                pages = None
+
+    if trace is not None:
+        trace.phase("solve", time.perf_counter() - start)
+    return rank / rank.sum(), work
+
+
+def push(graph, damping_factor, seeds, epsilon):
+    """
+    Return a dictionary mapping page numbers to their personalized
+    PageRank for a surfer who teleports to the page numbers in `seeds`,
+    a dictionary of weights summing to 1, computed by local push.
+
+    Rank still to be placed is held as residual on each page and pushed
+    along its links until every page's residual is at most `epsilon`
+    times its number of links, so the work done depends on how many
+    pages end up ranked rather than on the size of the corpus. A surfer
+    on a page without links teleports back to `seeds`.
+    """
+    indptr, indices = graph.indptr, graph.indices
+    estimate = {}
+    residual = dict(seeds)
+    queue = deque(residual)
+    queued = set(queue)
+    while queue:
+        page = queue.popleft()
+        queued.discard(page)
+        mass = residual.pop(page)
+        estimate[page] = estimate.get(page, 0) + (1 - damping_factor) * mass
+
+        start, end = indptr[page], indptr[page + 1]
+        if start == end:
+            targets = seeds.items()
+        else:
+            share = 1 / (end - start)
+            targets = ((link, share) for link in indices[start:end].tolist())
+        for link, weight in targets:
+            value = residual.get(link, 0) + damping_factor * mass * weight
+            residual[link] = value
+            degree = max(indptr[link + 1] - indptr[link], 1)
+            if value > epsilon * degree and link not in queued:
+                queue.append(link)
+                queued.add(link)
+    return estimate
+
+
+def personalized_iteration(graph, damping_factor, personalization,
+                           tolerance, max_iterations, trace=None):
+    """
+    Return the personalized PageRank vectors of `graph` for every
+    column of the sparse n-by-k matrix `personalization`, each column
+    a teleport distribution, and the number of iterations taken.
+
+    All k vectors advance together, one sparse matrix-matrix product
+    per iteration, until no value changes by more than `tolerance` or
+    `max_iterations` have run. As in `push`, a surfer on a page without
+    links teleports by its own column. If `trace` is given, the time
+    spent and every iteration are recorded in it.
+    """
+    start = time.perf_counter()
+    matrix = graph.transition_matrix()
+    dangling = graph.dangling
+    teleport = sparse.coo_matrix(personalization)
+    rows, columns, weights = teleport.row, teleport.col, teleport.data
+    if trace is not None:
+        trace.phase("matrix", time.perf_counter() - start)
+
+    start = time.perf_counter()
+    rank = teleport.toarray()
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+
+        # Surfers who get bored or reach a page without links restart
+        # from the seeds of their own column
+        restart = (1 - damping_factor) + damping_factor * (
+            rank[dangling].sum(axis=0))
+        new_rank = matrix @ rank
+        new_rank *= damping_factor
+        np.add.at(new_rank, (rows, columns), weights * restart[columns])
+
+        rank -= new_rank
+        change = np.abs(rank).max()
+        if trace is not None:
+            trace.record(iterations, time.perf_counter() - start, rank,
+                         tolerance)
+        rank = new_rank
+        if change <= tolerance:
+            break
+
+    if trace is not None:
+        trace.phase("solve", time.perf_counter() - start)
+    return rank / rank.sum(axis=0), iterations
+
+
+def sample_surfers(graph, damping_factor, samples, surfers=1000, groups=20,
+                   burn_in=0, seed=None):
+    """
+    Estimate PageRank from `samples` page visits made by `surfers`
+    independent random surfers walking `graph` in lockstep, each
+    starting on a random page and taking `burn_in` unrecorded steps
+    so that the starting page no longer biases its visits.
+
+    Surfers are split into `groups`, and the spread of the visit
+    frequencies between groups gives the standard error of each
+    estimate. Return the estimates and their standard errors, which
+    are NaN if there are too few surfers to form two groups.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(graph)
+    surfers = max(1, min(surfers, samples))
+    groups = min(groups, surfers)
+    degree = graph.out_degree
+    indptr, indices = graph.indptr, graph.indices
+
+    # Visits are buffered and counted per group with one bincount
+    offsets = (np.arange(surfers) % groups) * n
+    counts = np.zeros(groups * n, dtype=np.int64)
+    buffered = []
+    buffer_limit = max(1, 10 ** 6 // surfers)
+
+    pages = rng.integers(n, size=surfers)
+    remaining = samples
+    while remaining > 0:
+        if burn_in > 0:
+            burn_in -= 1
+        else:
+            visits = min(remaining, surfers)
+            buffered.append(offsets[:visits] + pages[:visits])
+            remaining -= visits
+            if len(buffered) == buffer_limit or remaining == 0:
+                counts += np.bincount(
+                    np.concatenate(buffered), minlength=groups * n)
+                buffered = []
+
+        # Each surfer follows one of its page's links with probability
+        # `damping_factor`, and otherwise (or on a page without links)
+        # jumps to a page chosen uniformly from the whole corpus
+        links = degree[pages]
+        following = np.flatnonzero(
+            (rng.random(surfers) < damping_factor) & (links > 0))
+        choice = rng.random(len(following)) * links[following]
+        next_pages = rng.integers(n, size=surfers)
+        next_pages[following] = indices[
+            indptr[pages[following]] + choice.astype(np.int64)]
+        pages = next_pages
+
+    counts = counts.reshape(groups, n)
+    estimate = counts.sum(axis=0) / samples
+    visits = counts.sum(axis=1, keepdims=True)
+    if groups < 2:
+        return estimate, np.full(n, np.nan)
+    frequencies = counts / np.maximum(visits, 1)
+    error = frequencies.std(axis=0, ddof=1) / np.sqrt(groups)
+    return estimate, error
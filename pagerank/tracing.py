@@ -0,0 +1,68 @@
+import csv
+import json
+
+# Fields recorded for each iteration, in the order they are exported
+FIELDS = ("iteration", "seconds", "residual", "max_change", "changed")
+
+
+class Trace():
+    """
+    Record of where a PageRank computation spent its time and how it
+    converged, filled in by the solvers when passed one.
+
+    `phases` maps each phase, such as building the link matrix, to the
+    seconds spent in it. `iterations` holds one record per iteration:
+    the seconds since solving started, the L1 norm of the change to
+    the rank vector, the largest change to any page, and the number of
+    pages that changed by more than `threshold`, which defaults to the
+    solver's tolerance. Each record is also passed to `callback`, if
+    given, as soon as it is made.
+    """
+
+    def __init__(self, callback=None, threshold=None):
+        self.callback = callback
+        self.threshold = threshold
+        self.phases = {}
+        self.iterations = []
+
+    def phase(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0) + seconds
+
+    def record(self, iteration, seconds, change, tolerance):
+        """
+        Record an iteration that changed the rank vector by `change`,
+        an array with one entry per page updated.
+        """
+        threshold = tolerance if self.threshold is None else self.threshold
+        magnitude = abs(change)
+        record = {
+            "iteration": iteration,
+            "seconds": seconds,
+            "residual": float(magnitude.sum()),
+            "max_change": float(magnitude.max(initial=0)),
+            "changed": int((magnitude > threshold).sum()),
+        }
+        self.iterations.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def save(self, path):
+        """
+        Write the iteration records to `path`, as CSV if its name ends
+        in ".csv" and as JSON otherwise.
+        """
+        with open(path, "w", newline="") as f:
+            if path.endswith(".csv"):
+                self.write_csv(f)
+            else:
+                self.write_json(f)
+
+    def write_json(self, f):
+        json.dump({"phases": self.phases, "iterations": self.iterations},
+                  f, indent=4)
+        f.write("\n")
+
+    def write_csv(self, f):
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(self.iterations)